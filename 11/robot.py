@@ -1,20 +1,33 @@
-from collections import defaultdict
-from intcode import Computer, IntcodeTerminated, State
-from typing import DefaultDict, List, Set, Tuple
+import struct
+import sys
+import time
+import zlib
+from grid import Grid
+from intcode import Computer, IntcodeTerminated, RecordSink, State
+from typing import Iterator, List, Tuple
 
 Index = Tuple[int, int]
 
+PAINT = bytes.maketrans(b"\x00\x01", b".#")
+GREY_LEVELS = bytes.maketrans(b"\x00\x01", b"\x00\xff")
+
 MOVES = {
 
 }
 
 class Robot:
     def __init__(self, code: List[int]):
-        self.grid: DefaultDict[Index, int] = defaultdict(int)
-        self.computer = Computer(code=code)
+        self.grid = Grid()
+        self.computer = Computer(
+            code=code,
+            output=RecordSink(2, self.paint_and_move),
+            input_provider=self.camera,
+        )
         self.pos = (0, 0)
         self.dir = (0, 1)
         self.grid[(0, 0)] = 1
+        # Panels painted at least once, whatever colour they ended up.
+        self.painted = Grid()
 
     def turn(self, turn_code: int) -> None:
         if turn_code == 0:
@@ -22,41 +35,106 @@ class Robot:
         elif turn_code == 1:
             self.dir = (self.dir[1], - self.dir[0])
 
+    def camera(self) -> int:
+        return self.grid[self.pos]
+
+    def paint_and_move(self, colour: int, turn_code: int) -> None:
+        self.grid[self.pos] = colour
+        self.painted[self.pos] = 1
+        self.turn(turn_code)
+        self.pos = (self.pos[0] + self.dir[0], self.pos[1] + self.dir[1])
+
     def run(self) -> int:
-        visited: Set[Index] = {self.pos}
         try:
-            while True:
-                paint_output = self.computer.run(self.grid[self.pos])
-                self.grid[self.pos] = paint_output
-                turn_output = self.computer.run(self.grid[self.pos])
-                self.turn(turn_output)
-                self.pos = (self.pos[0] + self.dir[0], self.pos[1] + self.dir[1])
-                visited.add(self.pos)
+            self.computer.run()
         except IntcodeTerminated:
-            return len(visited)
+            pass
+        return self.painted.count(1)
+
+    def count(self, colour: int) -> int:
+        return self.grid.count(colour)
 
     def min_x(self) -> int:
-        return min(i_x for i_x, _ in self.grid.keys())
+        return self.grid.min_x()
 
     def max_x(self) -> int:
-        return max(i_x for i_x, _ in self.grid.keys())
+        return self.grid.max_x()
 
     def min_y(self) -> int:
-        return min(i_y for _, i_y in self.grid.keys())
+        return self.grid.min_y()
 
     def max_y(self) -> int:
-        return max(i_y for _, i_y in self.grid.keys())
+        return self.grid.max_y()
 
     def __str__(self) -> str:
-        pixels = []
-        for j in range(self.max_y(), self.min_y() - 1, -1):
-            for i in range(self.min_x(), self.max_x() + 1):
-                pixels.append('#' if self.grid[(i, j)] else '.')
-            pixels.append('\n')
-        return ''.join(pixels)
+        return self.grid.render(PAINT, flip=True)
+
+    def _grey_rows(self) -> Iterator[bytes]:
+        for y in range(self.max_y(), self.min_y() - 1, -1):
+            yield self.grid.row(y).translate(GREY_LEVELS)
+
+    def to_pgm(self) -> bytes:
+        """The hull as a binary greyscale bitmap, white panels white."""
+        width = self.max_x() - self.min_x() + 1
+        height = self.max_y() - self.min_y() + 1
+        header = f"P5\n{width} {height}\n255\n".encode("ascii")
+        return header + b"".join(self._grey_rows())
+
+    def to_png(self) -> bytes:
+        """The hull as an 8-bit greyscale PNG."""
+        width = self.max_x() - self.min_x() + 1
+        height = self.max_y() - self.min_y() + 1
+        # Each scanline starts with filter type 0 (none).
+        raw = b"".join(b"\x00" + row for row in self._grey_rows())
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + _png_chunk(b"IDAT", zlib.compress(raw))
+            + _png_chunk(b"IEND", b"")
+        )
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    checksum = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", checksum)
+
+
+def langtons_ant(steps: int) -> List[int]:
+    """A painting program that runs Langton's ant for `steps` moves.
+
+    On black it paints white and turns left, on white the reverse; after
+    about 10,000 moves the ant settles into an endless diagonal highway,
+    so long runs keep growing the hull.
+    """
+    return [
+        3, 100,               # colour = input
+        1002, 100, -1, 101,   # paint = 1 - colour
+        1001, 101, 1, 101,
+        4, 101,               # output paint
+        4, 100,               # turn right on white, left on black
+        1001, 102, -1, 102,   # steps -= 1
+        1005, 102, 0,         # loop while steps remain
+        99,
+    ] + [0] * 78 + [0, 0, steps]
+
+
+def benchmark(steps: int) -> None:
+    robot = Robot(langtons_ant(steps))
+    robot.grid[(0, 0)] = 0
+    start = time.perf_counter()
+    painted = robot.run()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{steps} moves in {elapsed:.2f}s ({steps / elapsed:,.0f}/s), "
+        f"{painted} panels painted, hull {robot.max_x() - robot.min_x() + 1}"
+        f"x{robot.max_y() - robot.min_y() + 1}"
+    )
 
 
 if __name__ ==  "__main__":
+    if sys.argv[1:2] == ["--bench"]:
+        benchmark(int(sys.argv[2]))
+        sys.exit()
     with open("input.txt") as f:
         for line in f:
             code = [int(i) for i in line.split(",")]
@@ -64,5 +142,8 @@ if __name__ ==  "__main__":
     visited = r.run()
     print(visited)
     print(r)
+    if sys.argv[1:2] == ["--png"]:
+        with open(sys.argv[2], "wb") as png:
+            png.write(r.to_png())
 
 
@@ -0,0 +1,49 @@
+import struct
+import zlib
+
+from robot import Robot, langtons_ant
+
+
+def simulate_ant(steps):
+    white = set()
+    painted = set()
+    pos, direction = (0, 0), (0, 1)
+    for _ in range(steps):
+        on_white = pos in white
+        if on_white:
+            white.discard(pos)
+            direction = (direction[1], -direction[0])
+        else:
+            white.add(pos)
+            direction = (-direction[1], direction[0])
+        painted.add(pos)
+        pos = (pos[0] + direction[0], pos[1] + direction[1])
+    return white, painted
+
+
+def test_langtons_ant():
+    robot = Robot(langtons_ant(500))
+    robot.grid[(0, 0)] = 0
+    white, painted = simulate_ant(500)
+    assert robot.run() == len(painted)
+    assert robot.count(1) == len(white)
+    assert set(robot.grid.find(1)) == white
+
+
+def test_png_export():
+    robot = Robot(langtons_ant(500))
+    robot.grid[(0, 0)] = 0
+    robot.run()
+    png = robot.to_png()
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", png[16:24])
+    assert (width, height) == (
+        robot.max_x() - robot.min_x() + 1,
+        robot.max_y() - robot.min_y() + 1,
+    )
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    raw = zlib.decompress(png[41 : 41 + idat_length])
+    assert len(raw) == height * (width + 1)
+    assert raw.count(255) == robot.count(1)
+    rows = [raw[i * (width + 1) + 1 : (i + 1) * (width + 1)] for i in range(height)]
+    assert robot.to_pgm().endswith(b"".join(rows))
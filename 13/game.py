@@ -1,12 +1,17 @@
-from collections import defaultdict
+import sys
+import time
 from dataclasses import dataclass
 from enum import Enum
-from time import sleep
-from typing import DefaultDict, List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
 
-from intcode import Computer, IntcodeTerminated, InputRequested
+from grid import Grid
+from intcode import Computer, IntcodeTerminated, InputRequested, RecordSink
+from render import NullRenderer, TerminalRenderer
 
 Index = Tuple[int, int]
+Renderer = Union[NullRenderer, TerminalRenderer]
+
+TURBO_SLICE = 1_000_000
 
 class Tile(Enum):
     EMPTY = 0
@@ -24,62 +29,164 @@ TILE_CHARACTERS = {
 }
 
 @dataclass
-class Pixel:
-    pos: Index
-    tile: Tile
+class GameReport:
+    score: int
+    frames: int
+    instructions: int
+    seconds: float
+    predictions: int = 0
+    # Run by the forks that predict landings, on top of `instructions`.
+    lookahead_instructions: int = 0
+
+    @property
+    def ips(self) -> float:
+        total = self.instructions + self.lookahead_instructions
+        return total / self.seconds if self.seconds else float("inf")
+
+
+TILE_TABLE = bytes.maketrans(
+    bytes(tile.value for tile in TILE_CHARACTERS),
+    "".join(TILE_CHARACTERS.values()).encode("ascii"),
+)
 
 
 class Game:
-    def __init__(self, code: List[int]):
-        self.grid: DefaultDict[Index, Tile] = defaultdict(lambda: Tile.EMPTY)
-        self.computer = Computer(code=code)
+    def __init__(self, code: List[int], renderer: Optional[Renderer] = None):
+        self.grid = Grid(default=Tile.EMPTY.value)
+        self.renderer = NullRenderer() if renderer is None else renderer
+        self.computer = Computer(code=code, output=RecordSink(3, self.set_pixel))
         self.score = 0
         self.ball_pos = (0, 0)
         self.paddle_pos = (0, 0)
+        self.frames = 0
+        self.render_every = 1
+        self.lookahead = False
+        self.landing_x: Optional[int] = None
+        self.predictions = 0
+        self.lookahead_steps = 0
 
     def draw(self, move: int = 0) -> None:
         self.computer.inputs.append(move)
         try:
-            while True:
-                pixel = self.get_pixel()
-                if pixel:
-                    self.grid[pixel.pos] = pixel.tile
-                    if pixel.tile == Tile.BALL:
-                        self.ball_pos = pixel.pos
-                    if pixel.tile == Tile.PADDLE:
-                        self.paddle_pos = pixel.pos
-
+            self.computer.run()
         except (IntcodeTerminated, InputRequested):
             return
 
-    def get_pixel(self) -> Optional[Pixel]:
-        x = self.computer.run()
-        y = self.computer.run()
-        result = self.computer.run()
+    def autopilot(self, render_every: int = 1, lookahead: bool = False) -> GameReport:
+        """Play the rest of the game flat out, steering the paddle ourselves.
+
+        Only every `render_every`th frame is offered to the renderer. The
+        run is budgeted in large slices purely so instructions are counted.
+        With `lookahead` the paddle heads straight for where the ball will
+        come down instead of chasing it; the forks run to predict that are
+        counted separately.
+        """
+        self.render_every = render_every
+        self.lookahead = lookahead
+        frames = self.frames
+        predictions = self.predictions
+        steps = self.computer.steps
+        lookahead_steps = self.lookahead_steps
+        start = time.perf_counter()
+        self.computer.input_provider = self._steer
+        try:
+            while True:
+                self.computer.run(max_steps=TURBO_SLICE)
+        except IntcodeTerminated:
+            pass
+        finally:
+            self.computer.input_provider = None
+            self.renderer.draw(str(self))
+            self.renderer.close()
+        return GameReport(
+            score=self.score,
+            frames=self.frames - frames,
+            instructions=self.computer.steps - steps,
+            seconds=time.perf_counter() - start,
+            predictions=self.predictions - predictions,
+            lookahead_instructions=self.lookahead_steps - lookahead_steps,
+        )
+
+    def _steer(self) -> int:
+        # Each request for input is the end of a frame.
+        self.frames += 1
+        if self.frames % self.render_every == 0 and self.renderer.ready():
+            self.renderer.draw(str(self))
+        if not self.lookahead:
+            return get_paddle_input(self.ball_pos, self.paddle_pos)
+        paddle_x, paddle_y = self.paddle_pos
+        if self.landing_x is None:
+            self.landing_x = self.predict_landing()
+        move = (self.landing_x > paddle_x) - (self.landing_x < paddle_x)
+        if self.ball_pos[1] == paddle_y - 1:
+            # The paddle moves before the ball, so this move still counts
+            # for the bounce; predict afresh once the ball is on its way.
+            self.landing_x = None
+        return move
+
+    def predict_landing(self) -> int:
+        """The ball's x when it next comes down to the row above the paddle.
+
+        A fork of the game is run ahead with the paddle held still until it
+        draws the ball on that row, then stopped at the end of that frame.
+        The paddle doesn't touch the ball before then, so holding it still
+        doesn't change the ball's path.
+        """
+        self.predictions += 1
+        landing_row = self.paddle_pos[1] - 1
+        risen = [self.ball_pos[1] < landing_row]
+        landed: List[int] = []
+
+        def watch_ball(x: int, y: int, result: int) -> None:
+            if result != Tile.BALL.value or landed:
+                return
+            if y < landing_row:
+                risen[0] = True
+            elif risen[0]:
+                landed.append(x)
+
+        simulation = self.computer.fork()
+        simulation.output = RecordSink(3, watch_ball)
+        simulation.input_provider = lambda: None if landed else 0
+        steps = simulation.steps
+        try:
+            while True:
+                simulation.run(max_steps=TURBO_SLICE)
+        except (InputRequested, IntcodeTerminated):
+            pass
+        self.lookahead_steps += simulation.steps - steps
+        return landed[0] if landed else self.ball_pos[0]
+
+    def set_pixel(self, x: int, y: int, result: int) -> None:
         if (x, y) == (-1, 0):
             self.score = result
-            pixel = None
-        else:
-            pixel = Pixel((x, y), Tile(result))
-        return pixel
+            return
+        tile = Tile(result)
+        self.grid[(x, y)] = result
+        if tile == Tile.BALL:
+            self.ball_pos = (x, y)
+        if tile == Tile.PADDLE:
+            self.paddle_pos = (x, y)
+
+    def count(self, tile: Tile) -> int:
+        return self.grid.count(tile.value)
 
     def min_x(self) -> int:
-        return min(i_x for i_x, _ in self.grid.keys())
+        return self.grid.min_x()
 
     def max_x(self) -> int:
-        return max(i_x for i_x, _ in self.grid.keys())
+        return self.grid.max_x()
 
     def min_y(self) -> int:
-        return min(i_y for _, i_y in self.grid.keys())
+        return self.grid.min_y()
 
     def max_y(self) -> int:
-        return max(i_y for _, i_y in self.grid.keys())
+        return self.grid.max_y()
 
     def __str__(self) -> str:
         pixels: List[str] = [f"Score = {self.score}\n"]
         for j in range(self.min_y(), self.max_y()):
-            for i in range(self.min_x(), self.max_x() + 1):
-                pixels.append(TILE_CHARACTERS[self.grid[(i, j)]])
+            pixels.append(self.grid.row(j).translate(TILE_TABLE).decode("ascii"))
             pixels.append('\n')
         return ''.join(pixels)
 
@@ -100,16 +207,22 @@ if __name__ ==  "__main__":
             code = [int(i) for i in line.split(",")]
     g = Game(code=code)
     g.draw()
-    num_blocks = sum(1 for tile in g.grid.values() if tile == Tile.BLOCK)
+    num_blocks = g.count(Tile.BLOCK)
     print(num_blocks)
 
     code[0] = 2
-    g2 = Game(code=code)
-    g2.draw(0)
-    print(g2)
-    while True:
-        sleep(0.05)
-        g2.draw(get_paddle_input(g2.ball_pos, g2.paddle_pos))
+    args = sys.argv[1:]
+    live = "--live" in args
+    render_every = int(args[args.index("--every") + 1]) if "--every" in args else 1
+    g2 = Game(code=code, renderer=TerminalRenderer() if live else None)
+    report = g2.autopilot(render_every, lookahead="--lookahead" in args)
+    if not live:
         print(g2)
+    print(
+        f"score {report.score} in {report.frames} frames, "
+        f"{report.instructions} instructions, "
+        f"{report.lookahead_instructions} looking ahead, "
+        f"{report.ips:,.0f}/s, {report.predictions} predictions"
+    )
 
 
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+Index = Tuple[int, int]
+Row = Union[bytes, bytearray]
+
+
+class Grid:
+    """A 2-D map of byte values backed by one flat bytearray.
+
+    Cells that have never been written read as `default`. Writing outside
+    the allocation grows it in that direction, at least doubling the span so
+    repeated growth is amortised. The bounding box of written cells is kept
+    up to date on every write, so `min_x` and friends are O(1), and so is
+    the count of each value.
+    """
+
+    def __init__(
+        self,
+        default: int = 0,
+        width: int = 16,
+        height: int = 16,
+        origin: Index = (0, 0),
+    ):
+        self.default = default
+        self.width = width
+        self.height = height
+        self.left = origin[0] - width // 2
+        self.top = origin[1] - height // 2
+        self.cells = bytearray([default]) * (width * height)
+        self.bounds: Optional[list] = None
+        # Cells holding each value. The default's entry goes negative as
+        # default cells are overwritten, so it is left out of totals.
+        self.counts = [0] * 256
+
+    def __getitem__(self, index: Index) -> int:
+        x, y = index
+        i = x - self.left
+        j = y - self.top
+        if 0 <= i < self.width and 0 <= j < self.height:
+            return self.cells[j * self.width + i]
+        return self.default
+
+    def __setitem__(self, index: Index, value: int) -> None:
+        x, y = index
+        i = x - self.left
+        j = y - self.top
+        if not (0 <= i < self.width and 0 <= j < self.height):
+            self._reserve(x, y, x, y)
+            i = x - self.left
+            j = y - self.top
+        offset = j * self.width + i
+        old = self.cells[offset]
+        if old != value:
+            counts = self.counts
+            counts[old] -= 1
+            counts[value] += 1
+            self.cells[offset] = value
+        self._include(x, y)
+
+    def _include(self, x: int, y: int) -> None:
+        bounds = self.bounds
+        if bounds is None:
+            self.bounds = [x, x, y, y]
+            return
+        if x < bounds[0]:
+            bounds[0] = x
+        elif x > bounds[1]:
+            bounds[1] = x
+        if y < bounds[2]:
+            bounds[2] = y
+        elif y > bounds[3]:
+            bounds[3] = y
+
+    def _reserve(self, min_x: int, min_y: int, max_x: int, max_y: int) -> None:
+        left, top = self.left, self.top
+        right, bottom = left + self.width, top + self.height
+        if min_x < left:
+            left = min(min_x, left - self.width)
+        if max_x >= right:
+            right = max(max_x + 1, right + self.width)
+        if min_y < top:
+            top = min(min_y, top - self.height)
+        if max_y >= bottom:
+            bottom = max(max_y + 1, bottom + self.height)
+        if (left, top, right, bottom) == (
+            self.left,
+            self.top,
+            self.left + self.width,
+            self.top + self.height,
+        ):
+            return
+        width = right - left
+        cells = bytearray([self.default]) * (width * (bottom - top))
+        shift = self.left - left
+        for j in range(self.height):
+            start = (j + self.top - top) * width + shift
+            cells[start : start + self.width] = self.cells[
+                j * self.width : (j + 1) * self.width
+            ]
+        self.cells = cells
+        self.left, self.top = left, top
+        self.width, self.height = width, bottom - top
+
+    def set_row(self, y: int, data: Row, x: int = 0) -> None:
+        """Write `data` into row `y` starting at column `x` in one slice."""
+        if not data:
+            return
+        end = x + len(data) - 1
+        self._reserve(x, y, end, y)
+        start = (y - self.top) * self.width + x - self.left
+        old = self.cells[start : start + len(data)]
+        for value in set(old) | set(data):
+            self.counts[value] += data.count(value) - old.count(value)
+        self.cells[start : start + len(data)] = data
+        self._include(x, y)
+        self._include(end, y)
+
+    def append_row(self, data: Row, x: int = 0) -> None:
+        """Write `data` as a new row below the last written one."""
+        self.set_row(0 if self.bounds is None else self.bounds[3] + 1, data, x)
+
+    def min_x(self) -> int:
+        return self._bounds()[0]
+
+    def max_x(self) -> int:
+        return self._bounds()[1]
+
+    def min_y(self) -> int:
+        return self._bounds()[2]
+
+    def max_y(self) -> int:
+        return self._bounds()[3]
+
+    def _bounds(self) -> list:
+        if self.bounds is None:
+            raise ValueError("Grid is empty")
+        return self.bounds
+
+    def count(self, value: int) -> int:
+        """Number of cells in the bounding box holding `value`."""
+        if value != self.default:
+            return self.counts[value]
+        if self.bounds is None:
+            return 0
+        min_x, max_x, min_y, max_y = self.bounds
+        area = (max_x - min_x + 1) * (max_y - min_y + 1)
+        # Every non-default cell has been written, so lies inside the box.
+        return area - (sum(self.counts) - self.counts[value])
+
+    def offset(self, x: int, y: int) -> Optional[int]:
+        """Index of a cell in `cells`, or None if it is outside the allocation."""
+        i = x - self.left
+        j = y - self.top
+        if 0 <= i < self.width and 0 <= j < self.height:
+            return j * self.width + i
+        return None
+
+    def position(self, offset: int) -> Index:
+        j, i = divmod(offset, self.width)
+        return i + self.left, j + self.top
+
+    def find(self, value: int) -> Iterator[Index]:
+        """Yield the position of every cell holding `value`, row by row."""
+        if value == self.default:
+            raise ValueError("Can't search for the default value")
+        index = self.cells.find(value)
+        while index != -1:
+            yield self.position(index)
+            index = self.cells.find(value, index + 1)
+
+    def neighbours(self, x: int, y: int) -> Tuple[int, int, int, int]:
+        """Values at (x, y - 1), (x, y + 1), (x - 1, y) and (x + 1, y)."""
+        return self[x, y - 1], self[x, y + 1], self[x - 1, y], self[x + 1, y]
+
+    def row(self, y: int) -> bytes:
+        """Row `y` across the bounding box."""
+        min_x, max_x, _, _ = self._bounds()
+        if not self.top <= y < self.top + self.height:
+            return bytes([self.default]) * (max_x - min_x + 1)
+        start = (y - self.top) * self.width + min_x - self.left
+        return bytes(self.cells[start : start + max_x - min_x + 1])
+
+    def render(self, table: bytes, flip: bool = False) -> str:
+        """Draw the bounding box, mapping values to characters via `table`.
+
+        `table` is a 256-byte translation table, as made by `bytes.maketrans`.
+        Rows run from `min_y` to `max_y`, or the other way if `flip` is set.
+        """
+        if self.bounds is None:
+            return ""
+        ys = range(self.min_y(), self.max_y() + 1)
+        rows = (self.row(y).translate(table) for y in (reversed(ys) if flip else ys))
+        return "".join(row.decode("ascii") + "\n" for row in rows)
+
+
+class DistanceField:
+    """BFS distances over a grid from one or more sources, in one pass.
+
+    Distances are kept in a flat int array laid out like `grid.cells`, with
+    -1 for cells that can't be reached through `passable` values. The field
+    is a snapshot: it isn't updated if the grid is written or grows later.
+    """
+
+    def __init__(self, grid: Grid, sources: Iterable[Index], passable: Iterable[int]):
+        self.width = grid.width
+        self.height = grid.height
+        self.left = grid.left
+        self.top = grid.top
+        width = grid.width
+        cells = grid.cells
+        size = len(cells)
+        allowed = bytearray(256)
+        for value in passable:
+            allowed[value] = 1
+        distances = array("i", [-1]) * size
+        frontier: List[int] = []
+        for x, y in sources:
+            offset = grid.offset(x, y)
+            if offset is not None and distances[offset] < 0:
+                distances[offset] = 0
+                frontier.append(offset)
+
+        distance = 0
+        while frontier:
+            distance += 1
+            following: List[int] = []
+            for offset in frontier:
+                column = offset % width
+                for neighbour in (
+                    offset - width,
+                    offset + width,
+                    offset - 1 if column else -1,
+                    offset + 1 if column != width - 1 else -1,
+                ):
+                    if (
+                        0 <= neighbour < size
+                        and distances[neighbour] < 0
+                        and allowed[cells[neighbour]]
+                    ):
+                        distances[neighbour] = distance
+                        following.append(neighbour)
+            frontier = following
+        self.distances = distances
+        self.max_distance = distance - 1
+
+    def distance(self, x: int, y: int) -> Optional[int]:
+        """Length of the shortest path from the nearest source, if any."""
+        i = x - self.left
+        j = y - self.top
+        if not (0 <= i < self.width and 0 <= j < self.height):
+            return None
+        distance = self.distances[j * self.width + i]
+        return None if distance < 0 else distance
+
+    def fill_time(self) -> int:
+        """Steps for a flood from every source to reach every reachable cell."""
+        return self.max_distance
+
+    def farthest(self) -> Tuple[Index, int]:
+        """A reachable cell furthest from the sources, with its distance."""
+        if self.max_distance < 0:
+            raise ValueError("No source is inside the grid")
+        j, i = divmod(self.distances.index(self.max_distance), self.width)
+        return (i + self.left, j + self.top), self.max_distance
+
+    def reachable(self) -> int:
+        return len(self.distances) - self.distances.count(-1)
+
+    def path(self, x: int, y: int) -> List[Index]:
+        """A shortest path from a source to (x, y), found by walking downhill."""
+        distance = self.distance(x, y)
+        if distance is None:
+            return []
+        path = [(x, y)]
+        while distance:
+            distance -= 1
+            for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if self.distance(nx, ny) == distance:
+                    x, y = nx, ny
+                    break
+            path.append((x, y))
+        return path[::-1]
@@ -0,0 +1,45 @@
+from game import Game
+from intcode import InputRequested
+
+MOVES = 1000
+# The ball rises from just above the paddle at (5, 10), then comes down at x=10.
+BALL_PATH = [(5, 8), (6, 7), (7, 6), (8, 7), (9, 8), (10, 9)]
+
+
+def scripted_game(balls):
+    """A game that draws the paddle once, then the ball at each position.
+
+    Each frame ends by reading a joystick move, which is stored at
+    `MOVES + frame` and otherwise ignored.
+    """
+    code = [104, 5, 104, 10, 104, 3]
+    for frame, (x, y) in enumerate(balls):
+        code += [104, x, 104, y, 104, 4, 3, MOVES + frame]
+    code.append(99)
+    return code
+
+
+def test_predict_landing():
+    g = Game(scripted_game(BALL_PATH))
+    try:
+        g.computer.run()
+    except InputRequested:
+        pass
+    assert g.predict_landing() == 10
+    # The prediction runs on a fork, so the game itself hasn't moved on.
+    assert g.ball_pos == (5, 8)
+    assert g.predictions == 1
+    assert g.lookahead_steps > 0
+
+
+def test_lookahead_heads_for_landing():
+    chase = Game(scripted_game(BALL_PATH))
+    chase.autopilot()
+    assert [chase.computer[MOVES + i] for i in range(6)] == [0, 1, 1, 1, 1, 1]
+
+    g = Game(scripted_game(BALL_PATH))
+    report = g.autopilot(lookahead=True)
+    assert [g.computer[MOVES + i] for i in range(6)] == [1] * 6
+    assert report.frames == 6
+    assert report.predictions == 1
+    assert report.lookahead_instructions > 0
@@ -0,0 +1,40 @@
+import io
+
+from render import CLEAR_SCREEN, NullRenderer, TerminalRenderer, move_cursor
+
+
+def test_only_changed_cells_are_sent():
+    stream = io.StringIO()
+    renderer = TerminalRenderer(stream, fps=None)
+    renderer.draw("abc\ndef")
+    assert stream.getvalue() == CLEAR_SCREEN + move_cursor(0, 0) + "abc\ndef"
+
+    stream.seek(0)
+    stream.truncate()
+    renderer.draw("abc\ndXY\nz")
+    assert stream.getvalue() == move_cursor(1, 1) + "XY" + move_cursor(2, 0) + "z"
+
+    stream.seek(0)
+    stream.truncate()
+    renderer.draw("ab")
+    assert stream.getvalue() == (
+        move_cursor(0, 2) + " " + move_cursor(1, 0) + "   " + move_cursor(2, 0) + " "
+    )
+
+
+def test_frame_rate_cap():
+    now = [0.0]
+    renderer = TerminalRenderer(io.StringIO(), fps=10, clock=lambda: now[0])
+    assert renderer.ready()
+    renderer.draw("x")
+    now[0] = 0.05
+    assert not renderer.ready()
+    now[0] = 0.1
+    assert renderer.ready()
+
+
+def test_null_renderer():
+    renderer = NullRenderer()
+    assert not renderer.ready()
+    renderer.draw("x")
+    assert renderer.frames == 1
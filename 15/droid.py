@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from collections import deque
+import sys
 from dataclasses import dataclass
-from typing import Callable, Deque, List, Iterator, Set, Tuple, Optional
+from typing import List, Optional, Set, Union, cast
 
+from explore import Explorer, Node
+from grid import DistanceField, Grid
+from render import NullRenderer, TerminalRenderer
 from intcode import Computer, InputRequested
 
 MOVE_COMMANDS = (1, 2, 3, 4)
 
+Renderer = Union[NullRenderer, TerminalRenderer]
+
 
 @dataclass(eq=True, frozen=True)
 class Coordinate:
@@ -32,51 +37,76 @@ MOVE_VECTORS = {
 }
 
 
-@dataclass
-class Node:
-    computer: Computer
-    location: Coordinate
-    parent: Optional[Node] = None
-    goal: bool = False
-
-    def get_children(self) -> Iterator[Node]:
-        for command in MOVE_COMMANDS:
-            output: List[int] = []
-            child_computer = Computer(code=self.computer.code, output=output)
-            child_computer.inputs.append(command)
-            try:
-                child_computer.run()
-            except InputRequested:
-                pass
-            if output[-1] == 2:
-                yield Node(
-                    computer=child_computer,
-                    location=self.location + MOVE_VECTORS[command],
-                    parent=self,
-                    goal=True,
-                )
-            elif output[-1] == 1:
-                yield Node(
-                    computer=child_computer,
-                    location=self.location + MOVE_VECTORS[command],
-                    parent=self,
-                    goal=False,
-                )
-
-
-def search(start: Node, win_condition: Callable):
-    q: Deque[Node] = Deque([start])
-    visited: Set[Coordinate] = {start.location}
-    while q:
-        print(visited_nodes_map(visited))
-        node = q.popleft()
-        if win_condition(node):
-            return node
-        for child in node.get_children():
-            if child.location not in visited:
-                visited.add(child.location)
-                q.append(child)
-    return node
+WALL = 0
+OPEN = 1
+OXYGEN = 2
+UNKNOWN = 3
+PASSABLE = (OPEN, OXYGEN)
+
+TILE_CHARACTERS = bytes.maketrans(b"\x00\x01\x02\x03", b"#.O ")
+
+
+def classify(output: List[int]) -> Optional[int]:
+    return output[-1] if output[-1] != WALL else None
+
+
+def location_key(node: Node) -> Coordinate:
+    assert node.parent is not None and node.move is not None
+    return cast(Coordinate, node.parent.key) + MOVE_VECTORS[node.move]
+
+
+def droid_explorer() -> Explorer:
+    return Explorer(MOVE_COMMANDS, classify=classify, key=location_key)
+
+
+REVERSE_COMMANDS = {1: 2, 2: 1, 3: 4, 4: 3}
+
+
+def map_area(code: List[int], renderer: Optional[Renderer] = None) -> Grid:
+    """Map the area with one droid, backtracking by reversing each move.
+
+    Every cell is probed once from a neighbour, so the map costs a few
+    moves per cell and no VM is ever copied.
+    """
+    if renderer is None:
+        renderer = NullRenderer()
+    output: List[int] = []
+    computer = Computer(code, output=output)
+
+    def move(command: int) -> int:
+        computer.inputs.append(command)
+        try:
+            computer.run()
+        except InputRequested:
+            pass
+        return output.pop()
+
+    origin = Coordinate(0, 0)
+    tiles = Grid(default=UNKNOWN)
+    tiles[origin.x, origin.y] = OPEN
+    stack = [(origin, iter(MOVE_COMMANDS))]
+    path: List[int] = []
+    while stack:
+        location, commands = stack[-1]
+        for command in commands:
+            neighbour = location + MOVE_VECTORS[command]
+            if tiles[neighbour.x, neighbour.y] != UNKNOWN:
+                continue
+            status = move(command)
+            tiles[neighbour.x, neighbour.y] = status
+            if renderer.ready():
+                renderer.draw(tiles.render(TILE_CHARACTERS, flip=True))
+            if status != WALL:
+                stack.append((neighbour, iter(MOVE_COMMANDS)))
+                path.append(command)
+                break
+        else:
+            stack.pop()
+            if path:
+                move(REVERSE_COMMANDS[path.pop()])
+    renderer.close()
+    return tiles
+
 
 def visited_nodes_map(visited: Set[Coordinate]) -> str:
     min_x = -20
@@ -104,17 +134,22 @@ if __name__ == "__main__":
         for line in f:
             code = [int(i) for i in line.split(",")]
 
-    goal = search(
-        Node(computer=Computer(code), location=Coordinate(0, 0)),
-        win_condition=lambda n: n.goal,
-    )
-
-    goal.parent = None
-    new_goal = goal = search(goal, win_condition=lambda n: False)
-    furthest_point = new_goal.location
-
-    moves = 0
-    while new_goal.parent:
-        new_goal = new_goal.parent
-        moves += 1
-    print(moves)
+    if "--explorer" in sys.argv[1:]:
+        explorer = droid_explorer()
+        start = explorer.root(Computer(code), key=Coordinate(0, 0))
+        goal = explorer.search(start, goal=lambda n: n.outcome == OXYGEN)
+        assert goal is not None and goal.computer is not None
+        print(goal.depth)
+
+        # Flood the map from the oxygen system; the deepest node sets the time.
+        explorer = droid_explorer()
+        visited = explorer.explore(explorer.root(goal.computer, key=goal.key))
+        print(visited_nodes_map({cast(Coordinate, key) for key in visited}))
+        print(max(node.depth for node in visited.values()))
+    else:
+        live = "--live" in sys.argv[1:]
+        tiles = map_area(code, TerminalRenderer() if live else None)
+        oxygen = next(tiles.find(OXYGEN))
+        print(DistanceField(tiles, [(0, 0)], PASSABLE).distance(*oxygen))
+        print(tiles.render(TILE_CHARACTERS, flip=True))
+        print(DistanceField(tiles, [oxygen], PASSABLE).fill_time())
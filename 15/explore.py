@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from dataclasses import dataclass
+from itertools import count
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from intcode import Computer, InputRequested, IntcodeTerminated
+
+BFS = "bfs"
+DFS = "dfs"
+BEST_FIRST = "best"
+
+
+@dataclass(eq=False)
+class Node:
+    """A machine state reached by a sequence of moves from the start.
+
+    `computer` is dropped once every child has been generated, so only the
+    frontier holds VMs; the parent chain is kept for recovering paths.
+    """
+
+    computer: Optional[Computer]
+    key: Hashable = None
+    move: Optional[int] = None
+    outcome: Any = None
+    parent: Optional[Node] = None
+    depth: int = 0
+    halted: bool = False
+
+    def path(self) -> List[int]:
+        moves: List[int] = []
+        node: Optional[Node] = self
+        while node is not None and node.move is not None:
+            moves.append(node.move)
+            node = node.parent
+        return moves[::-1]
+
+
+def state_key(node: Node) -> Hashable:
+    """Key nodes on the Zobrist hash of their VM state.
+
+    Distinct states can collide, in which case the later one is treated as
+    already visited; pass a domain key (e.g. a position) when one exists.
+    """
+    assert node.computer is not None
+    return node.computer.hash()
+
+
+class Explorer:
+    """BFS, DFS or best-first search over the states of an Intcode machine.
+
+    Each move in `moves` is fed to a fork of the parent's machine, which runs
+    until it next wants input. `classify` turns the outputs of that step into
+    an outcome, or None to prune the move (e.g. the droid hit a wall).
+    `key` identifies equivalent states for the transposition table; it is
+    called with the new node, whose parent, move and outcome are set.
+    Best-first search pops the node with the lowest `priority`.
+    """
+
+    def __init__(
+        self,
+        moves: Sequence[int],
+        classify: Callable[[List[int]], Any],
+        key: Callable[[Node], Hashable] = state_key,
+        strategy: str = BFS,
+        priority: Optional[Callable[[Node], Any]] = None,
+    ):
+        if strategy not in (BFS, DFS, BEST_FIRST):
+            raise ValueError(f"Unknown strategy {strategy!r}")
+        if strategy == BEST_FIRST and priority is None:
+            raise ValueError("Best-first search needs a priority function")
+        self.moves = moves
+        self.classify = classify
+        self.key = key
+        self.strategy = strategy
+        self.priority = priority
+        self.visited: Dict[Hashable, Node] = {}
+        self.expanded = 0
+
+    def root(self, computer: Computer, key: Hashable = None) -> Node:
+        fork = computer.fork()
+        fork.output = []
+        node = Node(computer=fork)
+        node.key = self.key(node) if key is None else key
+        return node
+
+    def children(self, node: Node) -> Iterator[Node]:
+        """Yield the unpruned successors of a node, then drop its VM."""
+        assert node.computer is not None, "node has already been expanded"
+        for move in self.moves:
+            output: List[int] = []
+            computer = node.computer.fork()
+            computer.output = output
+            computer.inputs.append(move)
+            halted = False
+            try:
+                computer.run()
+            except InputRequested:
+                pass
+            except IntcodeTerminated:
+                halted = True
+            outcome = self.classify(output)
+            if outcome is None:
+                continue
+            child = Node(
+                computer=computer,
+                move=move,
+                outcome=outcome,
+                parent=node,
+                depth=node.depth + 1,
+                halted=halted,
+            )
+            child.key = self.key(child)
+            yield child
+        node.computer = None
+        self.expanded += 1
+
+    def walk(self, start: Node) -> Iterator[Node]:
+        """Yield each newly visited node in search order, starting at `start`."""
+        self.visited[start.key] = start
+        frontier = _Frontier(self.strategy, self.priority)
+        frontier.push(start)
+        while frontier:
+            node = frontier.pop()
+            yield node
+            if node.halted or node.computer is None:
+                continue
+            for child in self.children(node):
+                if child.key in self.visited:
+                    continue
+                self.visited[child.key] = child
+                frontier.push(child)
+
+    def search(
+        self, start: Node, goal: Callable[[Node], bool]
+    ) -> Optional[Node]:
+        """Return the first node satisfying `goal`, keeping its VM alive."""
+        for node in self.walk(start):
+            if goal(node):
+                return node
+        return None
+
+    def explore(self, start: Node) -> Dict[Hashable, Node]:
+        """Visit every reachable state, returning the transposition table."""
+        for _ in self.walk(start):
+            pass
+        return self.visited
+
+
+class _Frontier:
+    def __init__(self, strategy: str, priority: Optional[Callable[[Node], Any]]):
+        self.strategy = strategy
+        self.priority = priority
+        self.queue: Deque[Node] = deque()
+        self.heap: List[Any] = []
+        self.counter = count()
+
+    def push(self, node: Node) -> None:
+        if self.strategy == BEST_FIRST:
+            assert self.priority is not None
+            heapq.heappush(self.heap, (self.priority(node), next(self.counter), node))
+        else:
+            self.queue.append(node)
+
+    def pop(self) -> Node:
+        if self.strategy == BEST_FIRST:
+            return heapq.heappop(self.heap)[-1]
+        if self.strategy == DFS:
+            return self.queue.pop()
+        return self.queue.popleft()
+
+    def __bool__(self) -> bool:
+        return bool(self.heap or self.queue)
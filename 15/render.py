@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sys
+import time
+from typing import Callable, List, Optional, TextIO
+
+CLEAR_SCREEN = "\x1b[2J"
+
+
+def move_cursor(row: int, column: int) -> str:
+    return f"\x1b[{row + 1};{column + 1}H"
+
+
+class NullRenderer:
+    """Renderer that draws nothing, for running solvers headless."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def ready(self) -> bool:
+        return False
+
+    def draw(self, frame: str) -> None:
+        self.frames += 1
+
+    def close(self) -> None:
+        pass
+
+
+class TerminalRenderer:
+    """Redraws frames in place, writing only the cells that changed.
+
+    Frames are strings of newline-separated rows. The first frame clears the
+    screen; later ones are diffed row by row against the last frame drawn,
+    and each changed run of characters is sent after a cursor-positioning
+    escape code. `ready` caps the rate at `fps` frames per second, so
+    callers can skip building frames that would not be shown.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO = sys.stdout,
+        fps: Optional[float] = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.stream = stream
+        self.interval = 1 / fps if fps else 0.0
+        self.clock = clock
+        self.last_time: Optional[float] = None
+        self.previous: Optional[List[str]] = None
+        self.frames = 0
+
+    def ready(self) -> bool:
+        return (
+            self.last_time is None
+            or self.clock() - self.last_time >= self.interval
+        )
+
+    def draw(self, frame: str) -> None:
+        rows = frame.split("\n")
+        if self.previous is None:
+            out = [CLEAR_SCREEN, move_cursor(0, 0), frame]
+        else:
+            out = []
+            for number, row in enumerate(rows):
+                old = self.previous[number] if number < len(self.previous) else ""
+                if row != old:
+                    out.extend(_row_changes(number, old, row))
+            # Blank out rows the new frame no longer covers.
+            for number in range(len(rows), len(self.previous)):
+                out.append(move_cursor(number, 0) + " " * len(self.previous[number]))
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self.previous = rows
+        self.last_time = self.clock()
+        self.frames += 1
+
+    def close(self) -> None:
+        """Leave the cursor below the last frame."""
+        if self.previous is not None:
+            self.stream.write(move_cursor(len(self.previous), 0))
+            self.stream.flush()
+
+
+def _row_changes(number: int, old: str, new: str) -> List[str]:
+    if len(old) > len(new):
+        new = new.ljust(len(old))
+    out: List[str] = []
+    column = 0
+    while column < len(new):
+        if column < len(old) and old[column] == new[column]:
+            column += 1
+            continue
+        start = column
+        while column < len(new) and (column >= len(old) or old[column] != new[column]):
+            column += 1
+        out.append(move_cursor(number, start) + new[start:column])
+    return out
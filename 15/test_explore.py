@@ -0,0 +1,40 @@
+from explore import BEST_FIRST, DFS, Explorer
+from intcode import Computer
+
+# Adds each input to a running total and outputs the total.
+ACCUMULATOR = [3, 13, 1, 13, 14, 14, 4, 14, 1105, 1, 0, 99, 0, 0, 0]
+
+
+def up_to(limit):
+    return lambda output: output[-1] if output[-1] <= limit else None
+
+
+def test_bfs_finds_shortest_path():
+    explorer = Explorer((1, 2), classify=up_to(5), key=lambda n: n.outcome)
+    start = explorer.root(Computer(ACCUMULATOR), key=0)
+    goal = explorer.search(start, goal=lambda n: n.outcome == 5)
+    assert goal.depth == 3
+    assert sum(goal.path()) == 5
+    assert goal.computer is not None
+    assert start.computer is None
+
+
+def test_dfs_and_best_first_reach_goal():
+    for strategy, priority in ((DFS, None), (BEST_FIRST, lambda n: -(n.outcome or 0))):
+        explorer = Explorer(
+            (1, 2),
+            classify=up_to(5),
+            key=lambda n: n.outcome,
+            strategy=strategy,
+            priority=priority,
+        )
+        start = explorer.root(Computer(ACCUMULATOR), key=0)
+        goal = explorer.search(start, goal=lambda n: n.outcome == 5)
+        assert sum(goal.path()) == 5
+
+
+def test_state_key_dedups_repeated_states():
+    explorer = Explorer((0,), classify=up_to(5))
+    visited = explorer.explore(explorer.root(Computer(ACCUMULATOR)))
+    assert len(visited) == 1
+    assert explorer.expanded == 1
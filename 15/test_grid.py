@@ -0,0 +1,62 @@
+import pytest
+
+from grid import DistanceField, Grid
+
+
+def test_grows_in_every_direction():
+    g = Grid(width=2, height=2)
+    for x, y in [(0, 0), (-40, 3), (25, -17), (3, 60)]:
+        g[x, y] = 1
+    assert (g.min_x(), g.max_x(), g.min_y(), g.max_y()) == (-40, 25, -17, 60)
+    assert g[-40, 3] == g[25, -17] == g[3, 60] == 1
+    assert g[1000, 1000] == 0
+    assert g.count(1) == 4
+    assert g.count(0) == 66 * 78 - 4
+    assert sorted(g.find(1)) == [(-40, 3), (0, 0), (3, 60), (25, -17)]
+
+
+def test_empty_grid_has_no_bounds():
+    with pytest.raises(ValueError):
+        Grid().min_x()
+
+
+def test_rows_neighbours_and_render():
+    g = Grid(default=ord("."))
+    g.append_row(b".#.")
+    g.append_row(b"###")
+    g.append_row(b".#.")
+    assert g.neighbours(1, 1) == (ord("#"),) * 4
+    assert g.neighbours(0, 1) == (ord("."), ord("."), ord("."), ord("#"))
+    assert g.render(bytes.maketrans(b"", b"")) == ".#.\n###\n.#.\n"
+    g[0, -1] = ord("#")
+    assert g.render(bytes.maketrans(b"", b""), flip=True) == ".#.\n###\n.#.\n#..\n"
+
+
+def test_distance_field():
+    walls = Grid(default=ord("#"))
+    for row in (b"#######", b"#..#..#", b"#.##..#", b"#.....#", b"#######"):
+        walls.append_row(row)
+    field = DistanceField(walls, [(1, 1)], passable=b".")
+    assert field.distance(1, 1) == 0
+    assert field.distance(5, 1) == 8
+    assert field.distance(3, 1) is None
+    assert field.farthest() == ((5, 1), 8)
+    path = field.path(5, 1)
+    assert path[0] == (1, 1) and path[-1] == (5, 1) and len(path) == 9
+    assert field.reachable() == 12
+
+    both = DistanceField(walls, [(1, 1), (5, 1)], passable=b".")
+    assert both.fill_time() == 4
+    assert both.distance(3, 3) == 4
+
+
+def test_counts_follow_overwrites():
+    g = Grid()
+    g[0, 0] = 2
+    g[1, 0] = 2
+    g[1, 0] = 3
+    g[2, 0] = 0
+    g.set_row(1, b"\x02\x02\x00")
+    g.set_row(1, b"\x03\x00\x00")
+    assert (g.count(2), g.count(3), g.count(0)) == (1, 2, 3)
+    assert g.count(2) == g.cells.count(2)
@@ -1,72 +1,230 @@
-from collections import defaultdict
+import sys
 from dataclasses import dataclass, field
-from typing import DefaultDict, List, Tuple
+from typing import Callable, List, Optional, Set, Tuple
 
+from grid import Grid
 from intcode import Computer, IntcodeTerminated
 
 
 Index = Tuple[int, int]
+Routine = Tuple[str, ...]
+
+SCAFFOLD = ord("#")
+SPACE = ord(".")
+NEWLINE = ord("\n")
+VERBATIM = bytes(range(256))
+IS_SCAFFOLD = bytes(int(i == SCAFFOLD) for i in range(256))
+ROBOT_DIRECTIONS = {
+    ord("^"): (0, -1),
+    ord("v"): (0, 1),
+    ord("<"): (-1, 0),
+    ord(">"): (1, 0),
+}
+
+
+class CameraFeed:
+    """Output sink that builds camera frames as the characters arrive.
+
+    Characters go into a reusable row buffer, which is written into the
+    frame's grid a row at a time. A blank line ends the frame: it is passed
+    to `on_frame` and a fresh grid started, so a continuous video feed is
+    handled one frame at a time. Values outside ASCII, such as the dust
+    count, collect in `values`. Call `flush` when the program halts, to
+    pass on a frame it didn't finish with a blank line.
+    """
+
+    def __init__(self, on_frame: Callable[[Grid], None], width: int = 64):
+        self.on_frame = on_frame
+        self.row = bytearray(width)
+        self.length = 0
+        self.grid = Grid(default=SPACE)
+        self.frames = 0
+        self.values: List[int] = []
+
+    def append(self, value: int) -> None:
+        if value == NEWLINE:
+            if self.length:
+                self._end_row()
+            elif self.grid.bounds is not None:
+                self._end_frame()
+        elif 0 <= value < 128:
+            if self.length == len(self.row):
+                self.row.extend(bytes(len(self.row)))
+            self.row[self.length] = value
+            self.length += 1
+        else:
+            self.values.append(value)
+
+    def flush(self) -> None:
+        """Pass on any rows received since the last complete frame."""
+        if self.length:
+            self._end_row()
+        if self.grid.bounds is not None:
+            self._end_frame()
+
+    def _end_row(self) -> None:
+        self.grid.append_row(self.row[: self.length])
+        self.length = 0
+
+    def _end_frame(self) -> None:
+        self.frames += 1
+        self.on_frame(self.grid)
+        self.grid = Grid(default=SPACE)
 
 
 @dataclass
 class Vacuum:
     computer: Computer
-    grid: List[List[str]] = field(init=False)
+    grid: Grid = field(init=False)
 
     def __post_init__(self):
-        self.grid = []
+        self.grid = Grid(default=SPACE)
 
     def draw(self) -> str:
-        output: List[int] = []
-        self.computer.output = output
+        self.grid = Grid(default=SPACE)
+        feed = CameraFeed(on_frame=self.set_frame)
+        self.computer.output = feed
         try:
             self.computer.run()
         except IntcodeTerminated:
-            pass
+            feed.flush()
+        return self.grid.render(VERBATIM)
 
-        squares: List[str] = []
-        for o in output:
-            squares.append(chr(o))
-
-        text = "".join(squares)
-        self.grid = [list(line) for line in text.split("\n")][:-2]
-
-        return "".join(squares)
+    def set_frame(self, grid: Grid) -> None:
+        self.grid = grid
 
     def grid_size(self) -> Index:
-        return len(self.grid[0]) - 1, len(self.grid) - 1
+        return self.grid.max_x(), self.grid.max_y()
 
     def find_intersections(self) -> List[Index]:
-        inters = []
-        for j, row in enumerate(self.grid):
-            for i, char in enumerate(row):
-                if self._is_intersection(i, j):
-                    inters.append((i, j))
-        return inters
-
-    def _is_intersection(self, x: int, y: int) -> bool:
-        if self.grid[y][x] != "#":
-            return False
-        neighbours = self._get_neighbors(x, y)
-        if len(neighbours) != 4:
-            return False
-        for neighbour in neighbours:
-            if neighbour != "#":
-                return False
-        return True
-
-    def _get_neighbors(self, x: int, y: int) -> List[str]:
-        if x == 0 or y == 0:
-            return []
-        max_x, max_y = self.grid_size()
-        if x == max_x or y == max_y:
+        """Scaffold cells whose four neighbours are all scaffold.
+
+        The camera frame is packed into one big int with a byte per cell,
+        1 for scaffold, and each row followed by a blank cell so shifts
+        never wrap between rows. ANDing it with copies shifted one cell
+        each way and one row each way leaves just the intersections.
+        """
+        if self.grid.bounds is None:
             return []
-        return [
-            self.grid[y][x + 1],
-            self.grid[y][x - 1],
-            self.grid[y - 1][x],
-            self.grid[y + 1][x],
-        ]
+        left = self.grid.min_x()
+        top = self.grid.min_y()
+        stride = self.grid.max_x() - left + 2
+        frame = b"".join(
+            self.grid.row(y) + b"." for y in range(top, self.grid.max_y() + 1)
+        ).translate(IS_SCAFFOLD)
+        cells = int.from_bytes(frame, "little")
+        row = 8 * stride
+        crossings = (
+            cells
+            & (cells >> 8)
+            & (cells << 8)
+            & (cells >> row)
+            & (cells << row)
+        )
+        found = crossings.to_bytes(len(frame), "little")
+        intersections = []
+        index = found.find(1)
+        while index != -1:
+            y, x = divmod(index, stride)
+            intersections.append((x + left, y + top))
+            index = found.find(1, index + 1)
+        return intersections
+
+    def alignment(self) -> int:
+        return sum(x * y for x, y in self.find_intersections())
+
+    def robot(self) -> Tuple[Index, Index]:
+        """The robot's position and facing, from its glyph in the grid."""
+        for glyph, direction in ROBOT_DIRECTIONS.items():
+            for position in self.grid.find(glyph):
+                return position, direction
+        raise ValueError("The robot isn't in the camera grid")
+
+    def trace_path(self) -> List[str]:
+        """Turn and distance commands that take the robot to the scaffold's end.
+
+        The robot goes straight on through intersections and only turns at
+        corners, which covers all of the scaffold when it is a single path
+        that crosses itself. A robot starting with its back to the scaffold
+        turns around first.
+        """
+        (x, y), (dx, dy) = self.robot()
+        path: List[str] = []
+        while True:
+            if self._on_scaffold(x + dx, y + dy):
+                turn = None
+            elif self._on_scaffold(x + dy, y - dx):
+                turn, (dx, dy) = "L", (dy, -dx)
+            elif self._on_scaffold(x - dy, y + dx):
+                turn, (dx, dy) = "R", (-dy, dx)
+            elif not path and self._on_scaffold(x - dx, y - dy):
+                path.append("R")
+                turn, (dx, dy) = "R", (-dx, -dy)
+            else:
+                return path
+            distance = 0
+            while self._on_scaffold(x + dx, y + dy):
+                x, y = x + dx, y + dy
+                distance += 1
+            if turn is not None:
+                path.append(turn)
+            path.append(str(distance))
+
+    def _on_scaffold(self, x: int, y: int) -> bool:
+        return self.grid[x, y] == SCAFFOLD or self.grid[x, y] in ROBOT_DIRECTIONS
+
+
+def compress(
+    path: List[str], functions: int = 3, max_length: int = 20
+) -> Optional[Tuple[List[str], List[List[str]]]]:
+    """Split a movement path into a main routine and movement functions.
+
+    Returns the main routine as function names ("A", "B", ...) and the
+    body of each function, or None if the path is empty or can't be covered
+    by at most `functions` functions with every line within `max_length`
+    characters.
+
+    Functions are defined in the order the main routine first calls them,
+    each as a prefix of the path still to cover. Pruning comes from the
+    length limits, and states that have already failed are remembered.
+    """
+    if not path:
+        return None
+    max_calls = (max_length + 1) // 2
+    failed: Set[Tuple[int, Tuple[Routine, ...], int]] = set()
+
+    def solve(
+        start: int, bodies: Tuple[Routine, ...], calls: int
+    ) -> Optional[Tuple[List[int], Tuple[Routine, ...]]]:
+        if start == len(path):
+            return [], bodies
+        if calls == max_calls or (start, bodies, calls) in failed:
+            return None
+        for index, body in enumerate(bodies):
+            if tuple(path[start : start + len(body)]) == body:
+                found = solve(start + len(body), bodies, calls + 1)
+                if found is not None:
+                    return [index] + found[0], found[1]
+        if len(bodies) < functions:
+            length = -1
+            for end in range(start + 1, len(path) + 1):
+                length += len(path[end - 1]) + 1
+                if length > max_length:
+                    break
+                body = tuple(path[start:end])
+                if body in bodies:
+                    continue
+                found = solve(end, bodies + (body,), calls + 1)
+                if found is not None:
+                    return [len(bodies)] + found[0], found[1]
+        failed.add((start, bodies, calls))
+        return None
+
+    found = solve(0, (), 0)
+    if found is None:
+        return None
+    calls, bodies = found
+    return [chr(ord("A") + i) for i in calls], [list(body) for body in bodies]
 
 
 def inputs_to_ascii(inps: List[str]) -> List[int]:
@@ -82,28 +240,31 @@ if __name__ == "__main__":
     v = Vacuum(Computer(code))
     print(v.draw())
     print(f"intersections: {len(v.find_intersections())}")
-    print(f"Total alignment: {sum(x * y for x, y in v.find_intersections())}")
+    print(f"Total alignment: {v.alignment()}")
 
-    main_routine = ["A", "B", "A", "C", "B", "A", "C", "A", "C", "B"]
-    sub_a = ["L", "12", "L", "8", "L", "8"]
-    sub_b = ["L", "12", "R", "4", "L", "12", "R", "6"]
-    sub_c = ["R", "4", "L", "12", "L", "12", "R", "6"]
-    video = ["n"]
+    path = v.trace_path()
+    print(",".join(path))
+    compressed = compress(path)
+    assert compressed is not None
+    main_routine, functions = compressed
+    # The robot always reads three function definitions.
+    functions += [[]] * (3 - len(functions))
+    video = ["y"] if "--video" in sys.argv[1:] else ["n"]
 
     code[0] = 2
-    inputs = [
-        *inputs_to_ascii(main_routine),
-        *inputs_to_ascii(sub_a),
-        *inputs_to_ascii(sub_b),
-        *inputs_to_ascii(sub_c),
-        *inputs_to_ascii(video),
-    ]
+    inputs = inputs_to_ascii(main_routine)
+    for function in functions:
+        inputs += inputs_to_ascii(function)
+    inputs += inputs_to_ascii(video)
     print(inputs)
 
-    output: List[int] = []
-    v2 = Vacuum(Computer(code, inputs=inputs, output=output))
+    v2 = Vacuum(Computer(code, inputs=inputs))
+    feed = CameraFeed(on_frame=v2.set_frame)
+    v2.computer.output = feed
     try:
         v2.computer.run()
     except IntcodeTerminated:
-        pass
-    print(output)
+        feed.flush()
+    print(v2.grid.render(VERBATIM))
+    print(f"{feed.frames} frames")
+    print(feed.values)
@@ -0,0 +1,122 @@
+from ascii import VERBATIM, CameraFeed, Vacuum, compress
+from intcode import Computer
+
+EXAMPLE = "R,8,R,8,R,4,R,4,R,8,L,6,L,2,R,4,R,4,R,8,R,8,R,8,L,6,L,2".split(",")
+
+SCAFFOLD = """\
+#######...#####
+#.....#...#...#
+#.....#...#...#
+......#...#...#
+......#...###.#
+......#.....#.#
+^########...#.#
+......#.#...#.#
+......#########
+........#...#..
+....#########..
+....#...#......
+....#...#......
+....#...#......
+....#####......
+"""
+
+
+def expand(main_routine, functions):
+    path = []
+    for name in main_routine:
+        path += functions[ord(name) - ord("A")]
+    return path
+
+
+def check(path, functions=3, max_length=20):
+    main_routine, bodies = compress(path, functions, max_length)
+    assert expand(main_routine, bodies) == path
+    assert len(bodies) <= functions
+    for line in [main_routine, *bodies]:
+        assert len(",".join(line)) <= max_length
+
+
+def test_compress_example():
+    check(EXAMPLE)
+
+
+def test_compress_other_limits():
+    check(EXAMPLE * 2, functions=4, max_length=30)
+    assert compress(EXAMPLE, functions=1) is None
+    assert compress(["L", "123456789012345678901"]) is None
+    assert compress([]) is None
+
+
+def test_compress_full_length_path():
+    path = expand(
+        ["A", "B", "A", "C", "B", "A", "C", "A", "C", "B"],
+        [
+            ["L", "12", "L", "8", "L", "8"],
+            ["L", "12", "R", "4", "L", "12", "R", "6"],
+            ["R", "4", "L", "12", "L", "12", "R", "6"],
+        ],
+    )
+    check(path)
+
+
+def test_trace_path():
+    v = Vacuum(Computer([99]))
+    for line in SCAFFOLD.splitlines():
+        v.grid.append_row(line.encode("ascii"))
+    assert v.robot() == ((0, 6), (0, -1))
+    assert v.trace_path() == EXAMPLE
+
+
+def test_trace_path_turning_around():
+    v = Vacuum(Computer([99]))
+    for line in ["^..", "#..", "###"]:
+        v.grid.append_row(line.encode("ascii"))
+    assert v.trace_path() == ["R", "R", "2", "L", "2"]
+    v = Vacuum(Computer([99]))
+    v.grid.append_row(b"#####>")
+    assert v.trace_path() == ["R", "R", "5"]
+
+
+def test_intersections():
+    v = Vacuum(Computer([99]))
+    for line in [
+        "..#..........",
+        "..#..........",
+        "#######...###",
+        "#.#...#...#.#",
+        "#############",
+        "..#...#...#..",
+        "..#####...^..",
+    ]:
+        v.grid.append_row(line.encode("ascii"))
+    assert sorted(v.find_intersections()) == [(2, 2), (2, 4), (6, 4), (10, 4)]
+    assert v.alignment() == 76
+
+
+def test_intersections_on_a_wide_frame():
+    v = Vacuum(Computer([99]))
+    width = 3000
+    for j in range(30):
+        v.grid.append_row(b"#" * width if j % 2 else b"#." * (width // 2))
+    # Every scaffold column crossing an inner full row.
+    assert len(v.find_intersections()) == (width // 2 - 1) * 14
+
+
+def test_camera_feed_splits_frames():
+    frames = []
+    feed = CameraFeed(
+        on_frame=lambda grid: frames.append(grid.render(VERBATIM)), width=2
+    )
+    for value in b"#.#\n###\n\n.^.\n\n":
+        feed.append(value)
+    feed.append(1143523)
+    assert frames == ["#.#\n###\n", ".^.\n"]
+    assert feed.frames == 2
+    assert feed.values == [1143523]
+
+
+def test_partial_frame_is_flushed_on_halt():
+    # Prints "#.\n.^" and halts without ending the row or the frame.
+    v = Vacuum(Computer([104, 35, 104, 46, 104, 10, 104, 46, 104, 94, 99]))
+    assert v.draw() == "#.\n.^\n"
@@ -1,24 +1,25 @@
 from __future__ import annotations
 
-from collections import deque
-from copy import copy
-from dataclasses import dataclass, field
+from array import array
+from dataclasses import dataclass
 from enum import Enum, auto
 from heapq import heappop, heappush
 from datetime import datetime
 from typing import (
-    Deque,
     Dict,
-    FrozenSet,
     Iterator,
     List,
     Optional,
-    Set,
     Sequence,
     Tuple,
 )
 
 
+WALL = ord("#")
+KEY_A, KEY_Z = ord("a"), ord("z")
+DOOR_A, DOOR_Z = ord("A"), ord("Z")
+
+
 @dataclass(frozen=True, eq=True)
 class Coordinate:
     x: int
@@ -71,29 +72,20 @@ class Tile:
         return f"Tile(char='{self.char}')"
 
 
-@dataclass
-class BFSNode:
-    location: Coordinate
-    tile: Tile
-    doors: int = 0
-    depth: int = 0
-    parent: Optional[BFSNode] = None
-
-    def __post_init__(self):
-        self.keys = []
-
-
 @dataclass
 class DNode:
     positions: Tuple[str, ...]
     keys: int = 0
     dist: int = float("inf")
+    # A lower bound on the distance still to travel, for A*.
+    estimate: int = 0
+    pre: Optional[DNode] = None
 
     def __lt__(self, o: DNode):
-        return self.dist < o.dist
+        return self.dist + self.estimate < o.dist + o.estimate
 
     def __ge__(self, o: DNode):
-        return self.dist >= o.dist
+        return self.dist + self.estimate >= o.dist + o.estimate
 
 
 class Maze:
@@ -106,35 +98,134 @@ class Maze:
                 self.starts[f"START_{len(self.starts)}"] = c
             elif t.type == TileType.KEY:
                 self.keys[t.name] = c
+        self._build_cells()
         self.adj_matrix = self._build_adjacencies()
+        self._build_key_groups()
+        self.spanning_costs: Dict[int, int] = {}
+        self.expanded = 0
+
+    def shortest_path(self, a_star: bool = False):
+        """Fewest steps to collect every key, by Dijkstra or by A*.
 
-    def shortest_path(self):
+        A* orders states by distance so far plus `remaining_estimate`, which
+        never overestimates, so both find the same shortest path.
+        """
         start = DNode(
             positions=tuple(self.starts.keys()),
             dist=0,
         )
-        visited: Dict[Tuple[Tuple[str, ...], FrozenSet[str]], DNode] = {
+        self.expanded = 0
+        visited: Dict[Tuple[Tuple[str, ...], int], DNode] = {
             (start.positions, start.keys): start
         }
         q = [start]
 
         while q:
             node = heappop(q)
+            if visited[(node.positions, node.keys)] is not node:
+                # Superseded by a shorter route pushed since.
+                continue
+            self.expanded += 1
             if node.keys == 2 ** len(self.keys) - 1:
                 return node
             for child, child_keys, dist in self._neighbour_keys(node.positions, node.keys):
                 alt = dist + node.dist
                 child_node = visited.get((child, child_keys))
-                if not child_node:
-                    child_node = DNode(positions=child, keys=child_keys)
-                    visited[(child, child_keys)] = child_node
-                if alt < child_node.dist:
-                    child_node.dist = alt
-                    child_node.pre = node
-                    heappush(q, child_node)
+                if child_node and alt >= child_node.dist:
+                    continue
+                # Nodes in the heap are never changed, as that would break
+                # its ordering; a shorter route gets a fresh node instead.
+                if child_node:
+                    estimate = child_node.estimate
+                elif a_star:
+                    estimate = self.remaining_estimate(child, child_keys)
+                else:
+                    estimate = 0
+                child_node = DNode(
+                    positions=child, keys=child_keys, dist=alt, estimate=estimate
+                )
+                child_node.pre = node
+                visited[(child, child_keys)] = child_node
+                heappush(q, child_node)
 
         return visited
 
+    def remaining_estimate(self, positions: Sequence[str], keys: int) -> int:
+        """A lower bound on the steps needed to collect the remaining keys.
+
+        Keys fall into groups that can reach one another. Within a group,
+        the robots' remaining routes visit every uncollected key, so they
+        cost at least a spanning forest of those keys with one tree per
+        robot that can reach the group, plus one robot's walk to the group.
+        Doors are ignored, which can only make the bound lower. The forest
+        costs depend only on the collected keys, so they are cached per key
+        mask.
+        """
+        remaining = self.all_keys & ~keys
+        if not remaining:
+            return 0
+        cost = self.spanning_costs.get(keys)
+        if cost is None:
+            cost = self._spanning_cost(remaining)
+            self.spanning_costs[keys] = cost
+        for group in self.key_groups:
+            group_remaining = [k for k in group if key_int(k) & remaining]
+            if group_remaining:
+                cost += min(
+                    self.adj_matrix[position][k][0]
+                    for position in positions
+                    for k in group_remaining
+                    if k in self.adj_matrix[position]
+                )
+        return cost
+
+    def _spanning_cost(self, remaining: int) -> int:
+        """Kruskal over the remaining keys, one forest per key group."""
+        parent = {k: k for k in self.keys if key_int(k) & remaining}
+
+        def root(k: str) -> str:
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        chosen: Dict[int, List[int]] = {}
+        for dist, a, b in self.key_edges:
+            if a in parent and b in parent:
+                root_a, root_b = root(a), root(b)
+                if root_a != root_b:
+                    parent[root_a] = root_b
+                    chosen.setdefault(self.group_of[a], []).append(dist)
+        cost = 0
+        for group, dists in chosen.items():
+            # Edges come in ascending order; with r robots able to share a
+            # group, dropping its r - 1 longest edges leaves r trees.
+            robots = self.group_robots[group]
+            cost += sum(dists[: max(0, len(dists) - robots + 1)])
+        return cost
+
+    def _build_key_groups(self) -> None:
+        self.all_keys = 2 ** len(self.keys) - 1
+        self.key_edges = sorted(
+            (dist, a, b)
+            for a in self.keys
+            for b, (dist, _) in self.adj_matrix[a].items()
+            if a < b
+        )
+        self.group_of: Dict[str, int] = {}
+        self.key_groups: List[List[str]] = []
+        for key in sorted(self.keys):
+            if key in self.group_of:
+                continue
+            group = [key] + sorted(self.adj_matrix[key])
+            for k in group:
+                self.group_of[k] = len(self.key_groups)
+            self.key_groups.append(group)
+        self.group_robots = [
+            sum(1 for s in self.starts if group[0] in self.adj_matrix[s])
+            for group in self.key_groups
+        ]
+
     def _neighbour_keys(
         self, key_names: Sequence[str], keys: int
     ) -> Iterator[Tuple[Tuple[str, ...], int, int]]:
@@ -157,42 +248,49 @@ class Maze:
             adj_map[key_name] = self._adjacency_bfs(key_location)
         return adj_map
 
-    def _next_moves(self, n: BFSNode) -> Iterator[BFSNode]:
-        for location in n.location.neighbours():
-            tile = self.maze[location]
-            if tile.type == TileType.WALL:
-                continue
+    def _build_cells(self) -> None:
+        """Lay the maze out as one byte per cell, walled in on every side.
 
-            child = BFSNode(
-                location=location,
-                tile=tile,
-                depth=n.depth + 1,
-                doors=copy(n.doors),
-                parent=n,
-            )
-            if tile.type == TileType.DOOR:
-                child.doors |= key_int(tile.name)
+        Cells are addressed by a single int, so a step in any direction is
+        adding one of `offsets`.
+        """
+        self.width = max(c.x for c in self.maze) + 3
+        height = max(c.y for c in self.maze) + 3
+        self.cells = bytearray([WALL]) * (self.width * height)
+        for c, t in self.maze.items():
+            self.cells[self.cell_index(c)] = ord(t.char)
+        self.offsets = (-self.width, self.width, -1, 1)
 
-            yield child
+    def cell_index(self, c: Coordinate) -> int:
+        return (c.y + 1) * self.width + c.x + 1
 
     def _adjacency_bfs(
         self, start_location: Coordinate
     ) -> Dict[str, Tuple[int, int]]:
-        start = BFSNode(
-            location=start_location,
-            tile=self.maze[start_location],
-        )
-        q: Deque[BFSNode] = deque([start])
+        cells = self.cells
+        offsets = self.offsets
+        start = self.cell_index(start_location)
+        depths = array("i", [-1]) * len(cells)
+        doors = array("q", [0]) * len(cells)
+        depths[start] = 0
+        queue = [start]
         adjancancies: Dict[str, Tuple[int, int]] = {}
-        visited: Set[Coordinate] = {start.location}
-        while q:
-            node = q.popleft()
-            if node.tile.type == TileType.KEY and node != start:
-                adjancancies[node.tile.name] = (node.depth, node.doors)
-            for move in self._next_moves(node):
-                if move.location not in visited:
-                    visited.add(move.location)
-                    q.append(move)
+        # The queue grows as it is walked, so this visits cells in BFS order.
+        for cell in queue:
+            char = cells[cell]
+            if KEY_A <= char <= KEY_Z and cell != start:
+                adjancancies[chr(char)] = (depths[cell], doors[cell])
+            for offset in offsets:
+                neighbour = cell + offset
+                neighbour_char = cells[neighbour]
+                if neighbour_char == WALL or depths[neighbour] >= 0:
+                    continue
+                depths[neighbour] = depths[cell] + 1
+                if DOOR_A <= neighbour_char <= DOOR_Z:
+                    doors[neighbour] = doors[cell] | 1 << (neighbour_char - DOOR_A)
+                else:
+                    doors[neighbour] = doors[cell]
+                queue.append(neighbour)
         return adjancancies
 
 
@@ -213,6 +311,6 @@ if __name__ == "__main__":
                 maze[Coordinate(i, j)] = Tile(char)
     m = Maze(maze=maze)
     now = datetime.now()
-    ans = m.shortest_path()
+    ans = m.shortest_path(a_star=True)
     print(f"Time taken: {datetime.now() - now}")
     print(ans.dist)
@@ -0,0 +1,36 @@
+from keys import Coordinate, Maze, Tile
+
+
+def load(name):
+    maze = {}
+    with open(name) as f:
+        for j, line in enumerate(f):
+            for i, char in enumerate(line.strip()):
+                maze[Coordinate(i, j)] = Tile(char)
+    return Maze(maze=maze)
+
+
+def test_adjacencies():
+    m = load("test_input.txt")
+    # Distances to each key, with the doors in the way as a bitmask.
+    assert m.adj_matrix["START_0"] == {
+        "a": (1, 0),
+        "b": (2, 0),
+        "d": (4, 1 << 2),
+        "e": (1, 0),
+        "f": (4, 1 << 3),
+        "g": (6, 1 << 2 | 1 << 5),
+    }
+
+
+def test_shortest_path():
+    assert load("test_input.txt").shortest_path().dist == 72
+
+
+def test_a_star_agrees_with_dijkstra():
+    m = load("test_input.txt")
+    dijkstra = m.shortest_path().dist
+    dijkstra_expanded = m.expanded
+    assert m.shortest_path(a_star=True).dist == dijkstra
+    assert m.expanded < dijkstra_expanded
+    assert m.remaining_estimate(tuple(m.starts), 0) <= dijkstra
@@ -1,10 +1,11 @@
 from typing import Optional
 
-from intcode import Computer, IntcodeTerminated
+from image import SharedImage, run_many
+from transpile import Program, compile_program
 
 class BeamSearcher():
-    def __init__(self, c: Computer, x: int, y: int):
-        self.c = c
+    def __init__(self, program: Program, x: int, y: int):
+        self.program = program
         self.x = x
         self.y = y
 
@@ -18,15 +19,13 @@ class BeamSearcher():
         return self.in_beam(top_right_x, top_right_y)
 
     def in_beam(self, x: Optional[int] = None, y: Optional[int] = None) -> bool:
-        c.reset()
         if not x:
             x = self.x
         if not y:
             y = self.y
 
-        c.inputs = [x, y]
         print(x, y)
-        return bool(c.run())
+        return bool(self.program([x, y])[0])
 
     def find_bottom(self):
         y_in_beam = False
@@ -48,18 +47,14 @@ if __name__ == "__main__":
         for line in f:
             code = [int(i) for i in line.split(",")]
 
-    c = Computer(code=code)
-
-    beam_affected = 0
-
-    # for i in range(50):
-    #     for j in range(50):
-    #         beam_affected += 1 if in_beam(c, i, j) else 0
-    # print(beam_affected)
+    with SharedImage.publish(code) as image:
+        points = [[i, j] for i in range(50) for j in range(50)]
+        beam_affected = sum(output[0] for output in run_many(image, points))
+    print(beam_affected)
 
     x = 100
     y = 100
-    bs = BeamSearcher(c, x, y)
+    bs = BeamSearcher(compile_program(code), x, y)
 
     while not bs.big_enough():
         print(bs.x, bs.y)
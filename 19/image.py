@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Final, Iterable, List, Optional, Sequence
+
+from intcode import Computer, IntcodeTerminated
+
+ITEM_FORMAT: Final = "q"
+ITEM_SIZE = array(ITEM_FORMAT).itemsize
+
+
+class SharedImage:
+    """A program published once into shared memory as packed 64-bit ints.
+
+    Pickling an image only sends its name and length, so it is cheap to pass
+    to worker processes, which attach to the same block of memory.
+    """
+
+    def __init__(self, name: str, length: int):
+        self.name = name
+        self.length = length
+        self.owner = False
+        self.shm = _attach(name)
+
+    @classmethod
+    def publish(cls, code: Sequence[int]) -> SharedImage:
+        packed = array(ITEM_FORMAT, code)
+        shm = SharedMemory(create=True, size=max(1, len(packed) * ITEM_SIZE))
+        assert shm.buf is not None
+        shm.buf[: len(packed) * ITEM_SIZE] = packed.tobytes()
+        image = cls.__new__(cls)
+        image.name = shm.name
+        image.length = len(packed)
+        image.owner = True
+        image.shm = shm
+        return image
+
+    @property
+    def view(self) -> memoryview:
+        buf = self.shm.buf
+        assert buf is not None, "image has been closed"
+        return buf.cast(ITEM_FORMAT)[: self.length].toreadonly()
+
+    def computer(
+        self, inputs: Optional[List[int]] = None, output: Optional[List[int]] = None
+    ) -> Computer:
+        return Computer.from_image(self.view, inputs=inputs, output=output)
+
+    def close(self) -> None:
+        """Detach, and free the memory if this process published it.
+
+        Machines built with `computer` must be dropped first, as they hold
+        views onto the shared block.
+        """
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __reduce__(self):
+        return (SharedImage, (self.name, self.length))
+
+    def __enter__(self) -> SharedImage:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _attach(name: str) -> SharedMemory:
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the block with the resource tracker,
+    # which would unlink it when this process exits. The tracker only runs
+    # on POSIX, where it keys blocks on their name with a leading slash.
+    shm = SharedMemory(name=name)
+    resource_tracker.unregister("/" + shm.name, "shared_memory")
+    return shm
+
+
+_worker_image: Optional[SharedImage] = None
+
+
+def _init_worker(image: SharedImage) -> None:
+    global _worker_image
+    _worker_image = image
+
+
+def _run_task(inputs: List[int]) -> List[int]:
+    assert _worker_image is not None
+    output: List[int] = []
+    computer = _worker_image.computer(inputs=list(inputs), output=output)
+    try:
+        computer.run()
+    except IntcodeTerminated:
+        pass
+    return output
+
+
+def run_many(
+    image: SharedImage,
+    inputs: Iterable[List[int]],
+    processes: Optional[int] = None,
+    chunksize: int = 64,
+) -> List[List[int]]:
+    """Run the program once per input list across a pool of workers.
+
+    Each worker attaches to the image once; tasks only carry their inputs.
+    """
+    with Pool(processes, initializer=_init_worker, initargs=(image,)) as pool:
+        return pool.map(_run_task, inputs, chunksize)
@@ -1,12 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+import pickle
+import time
+from array import array
 from copy import copy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 from itertools import permutations
-from typing import List, Optional, Tuple, overload
+from typing import (
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    MutableSequence,
+    Optional,
+    Protocol,
+    Sequence,
+    SupportsIndex,
+    Tuple,
+    Union,
+    overload,
+)
 
 
 TARGET = 19690720
 
+# Instructions run between clock checks when running against a deadline.
+DEADLINE_SLICE = 10000
+
+HASH_MASK = 0xFFFFFFFFFFFFFFFF
+PT_KEY = -1
+RELATIVE_BASE_KEY = -2
+
 
 class Operation(Enum):
     ADD = 1
@@ -42,6 +69,22 @@ OP_PARAMETER_MAP = {
 
 JUMP_OPS = {Operation.JUMP_TRUE, Operation.JUMP_FALSE}
 
+# Index of the parameter each operation writes to, if any.
+OP_WRITE_PARAMETER = {
+    Operation.ADD: 2,
+    Operation.MULTIPLY: 2,
+    Operation.INPUT: 0,
+    Operation.LESS_THAN: 2,
+    Operation.EQUALS: 2,
+}
+
+# Called with (computer, address, value).
+WatchCallback = Callable[["Computer", int, int], None]
+BreakCallback = Callable[["Computer"], None]
+InputProvider = Callable[[], Optional[int]]
+# A machine's memory: a list, or a read-only image shared until first written.
+Memory = Union[List[int], memoryview]
+
 
 @dataclass
 class Instruction:
@@ -67,39 +110,169 @@ def get_instruction(instruction_number: int) -> Instruction:
     return Instruction(operation=op, parameters=params)
 
 
+def zobrist_key(pos: int, value: int) -> int:
+    """64-bit key for `value` stored at `pos`, zero for empty cells.
+
+    Keys are derived with a splitmix64 mix rather than a random table so that
+    unbounded addresses and values need no storage.
+    """
+    if not value:
+        return 0
+    z = (pos * 0x9E3779B97F4A7C15 + value * 0xD1B54A32D192ED03) & HASH_MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+    return z ^ (z >> 31)
+
+
+def memory_hash(code: Memory) -> int:
+    h = 0
+    for pos, value in enumerate(code):
+        h ^= zobrist_key(pos, value)
+    return h
+
+
+def copy_memory(code: Memory) -> Memory:
+    # Read-only images are shared rather than copied; writes copy them.
+    if isinstance(code, memoryview):
+        return code
+    return copy(code)
+
+
 class State(Enum):
     NOT_STARTED = auto()
     RUNNING = auto()
     WAITING = auto()
+    PREEMPTED = auto()
     HALTED = auto()
 
 
+class OutputSink(Protocol):
+    """Anything outputs can be appended to: a list, or one of the sinks below."""
+
+    def append(self, value: int, /) -> None:
+        ...
+
+
+class AsciiSink:
+    """Output sink collecting ASCII output as bytes.
+
+    Values outside the ASCII range, such as a final answer printed after the
+    text, go to `values`. If given, `on_line` is called with each complete
+    line of text, without its newline.
+    """
+
+    def __init__(self, on_line: Optional[Callable[[str], None]] = None):
+        self.buffer = bytearray()
+        self.values: List[int] = []
+        self.on_line = on_line
+        self.line_start = 0
+
+    def append(self, value: int) -> None:
+        if 0 <= value < 128:
+            self.buffer.append(value)
+            if value == 10 and self.on_line is not None:
+                line = self.buffer[self.line_start : -1].decode("ascii")
+                self.line_start = len(self.buffer)
+                self.on_line(line)
+        else:
+            self.values.append(value)
+
+    def text(self) -> str:
+        return self.buffer.decode("ascii")
+
+
+class RecordSink:
+    """Output sink grouping every `arity` outputs into one record.
+
+    Complete records are passed to `on_record` as separate arguments, or
+    collected as tuples in `records` if there is no callback.
+    """
+
+    def __init__(self, arity: int, on_record: Optional[Callable[..., None]] = None):
+        self.arity = arity
+        self.on_record = on_record
+        self.record = [0] * arity
+        self.filled = 0
+        self.records: List[Tuple[int, ...]] = []
+
+    def append(self, value: int) -> None:
+        self.record[self.filled] = value
+        self.filled += 1
+        if self.filled == self.arity:
+            self.filled = 0
+            if self.on_record is not None:
+                self.on_record(*self.record)
+            else:
+                self.records.append(tuple(self.record))
+
+
 class Computer:
     def __init__(
         self,
         code: List[int],
         inputs: Optional[List[int]] = None,
-        output: Optional[List[int]] = None,
+        output: Optional[OutputSink] = None,
+        input_provider: Optional[InputProvider] = None,
     ):
-        self.code = copy(code)
-        self.initial_code = copy(code)
+        self.code: Memory = copy(code)
+        self.initial_code: Memory = copy(code)
+        # Computed on the first call to hash(), then kept up to date on writes.
+        self.memory_hash: Optional[int] = None
         self.output = output
+        # Asked for a value when INPUT finds the queue empty; returning None
+        # means no input is available yet.
+        self.input_provider = input_provider
         self.state = State.NOT_STARTED
         self.pt = 0
         self.relative_base = 0
+        # Instructions executed, only counted by budgeted runs.
+        self.steps = 0
+        self.block_lengths: Dict[Tuple[int, int], int] = {}
         if inputs is None:
             self.inputs: List[int] = []
         else:
             self.inputs = inputs
+        self.read_watches: Dict[int, List[WatchCallback]] = {}
+        self.write_watches: Dict[int, List[WatchCallback]] = {}
+        self.breakpoints: Dict[int, List[BreakCallback]] = {}
+        # pt of an instruction whose callbacks have fired but which is still
+        # waiting on input, so they don't fire again when it is retried.
+        self._waiting_pt: Optional[int] = None
+
+    @classmethod
+    def from_image(
+        cls,
+        image: memoryview,
+        inputs: Optional[List[int]] = None,
+        output: Optional[OutputSink] = None,
+    ) -> Computer:
+        """Machine running over a read-only memory image without copying it.
+
+        Memory is copied into a list the first time the program writes to it.
+        """
+        computer = cls([], inputs=inputs, output=output)
+        computer.code = image.toreadonly()
+        computer.initial_code = computer.code
+        return computer
 
     def __setitem__(self, pos: int, value: int) -> None:
         try:
+            old = self.code[pos]
             self.code[pos] = value
         except IndexError as e:
             if pos < 0:
                 raise
+            old = 0
             extra_space = pos - len(self.code)
+            if not isinstance(self.code, list):
+                self.code = list(self.code)
             self.code.extend([0] * extra_space + [value])
+        except TypeError:
+            # First write to a read-only image, see `from_image`.
+            self.code = list(self.code)
+            self.code[pos] = value
+        if self.memory_hash is not None:
+            self.memory_hash ^= zobrist_key(pos, old) ^ zobrist_key(pos, value)
 
     @overload
     def __getitem__(self, pos: int) -> int:
@@ -140,9 +313,226 @@ class Computer:
             return pos + self.relative_base
         raise ValueError
 
-    def run(self) -> int:
+    def watch_read(self, address: int, callback: WatchCallback) -> None:
+        self.read_watches.setdefault(address, []).append(callback)
+
+    def watch_write(self, address: int, callback: WatchCallback) -> None:
+        self.write_watches.setdefault(address, []).append(callback)
+
+    def break_at(self, pt: int, callback: BreakCallback) -> None:
+        self.breakpoints.setdefault(pt, []).append(callback)
+
+    def clear_watches(self) -> None:
+        self.read_watches = {}
+        self.write_watches = {}
+        self.breakpoints = {}
+
+    def operand_addresses(
+        self, instruction: Instruction
+    ) -> Tuple[List[int], List[int]]:
+        """Memory addresses the instruction at pt reads from and writes to."""
+        reads: List[int] = []
+        writes: List[int] = []
+        write_param = OP_WRITE_PARAMETER.get(instruction.operation)
+        for i, mode in enumerate(instruction.parameters):
+            if mode == Mode.IMMEDIATE:
+                continue
+            address = self.get_output_pos(mode, self[self.pt + i + 1])
+            if i == write_param:
+                writes.append(address)
+            else:
+                reads.append(address)
+        return reads, writes
+
+    def run(
+        self, max_steps: Optional[int] = None, deadline: Optional[float] = None
+    ) -> Optional[int]:
+        """Run until output, input starvation or halt.
+
+        With `max_steps` or a `time.monotonic()` `deadline`, the run can also
+        stop early, leaving the machine PREEMPTED and returning None; calling
+        run() again carries on where it left off. The step budget is only
+        checked at jumps, so a run may go up to one basic block past it.
+        """
+        if deadline is not None:
+            return self._run_until(deadline, max_steps)
+        # Watches are only looked at here so an unwatched machine runs the
+        # plain loop below with no per-instruction checks.
+        if self.read_watches or self.write_watches or self.breakpoints:
+            return self._run_instrumented(max_steps)
+        if max_steps is None:
+            return self._run()
+        return self._run(stop_at=self.steps + max_steps)
+
+    def _run_until(self, deadline: float, max_steps: Optional[int]) -> Optional[int]:
+        stop_at = None if max_steps is None else self.steps + max_steps
+        while True:
+            slice_steps = DEADLINE_SLICE
+            if stop_at is not None:
+                slice_steps = min(slice_steps, stop_at - self.steps)
+            out = self.run(max_steps=slice_steps)
+            if self.state != State.PREEMPTED:
+                return out
+            if stop_at is not None and self.steps >= stop_at:
+                return None
+            if time.monotonic() >= deadline:
+                return None
+
+    def block_length(self, start: int, end: int) -> int:
+        """Number of instructions from `start` up to, not including, `end`."""
+        key = (start, end)
+        length = self.block_lengths.get(key)
+        if length is None:
+            length = 0
+            pt = start
+            while pt < end:
+                operation = get_instruction(self[pt]).operation
+                pt += OP_PARAMETER_MAP[operation] + 1
+                length += 1
+            self.block_lengths[key] = length
+        return length
+
+    def stream_outputs(self) -> Generator[Optional[int], Optional[int], None]:
+        """Yield outputs as they are produced until the program halts.
+
+        Values passed in with send() are queued as inputs. If the program
+        needs input and none is queued, None is yielded; sending nothing back
+        at that point raises InputRequested.
+        """
+        output, self.output = self.output, None
+        try:
+            while True:
+                try:
+                    value: Optional[int] = self.run()
+                except IntcodeTerminated:
+                    return
+                except InputRequested:
+                    value = None
+                sent = yield value
+                if sent is not None:
+                    self.inputs.append(sent)
+                elif value is None:
+                    raise InputRequested()
+        finally:
+            self.output = output
+
+    async def astream_outputs(
+        self,
+    ) -> AsyncGenerator[Optional[int], Optional[int]]:
+        """Async version of `stream_outputs`, fed through asend().
+
+        The machine itself still runs synchronously, so it blocks the event
+        loop until it next outputs, needs input or halts; other tasks only
+        get a turn after each value is yielded.
+        """
+        stream = self.stream_outputs()
+        sent = None
+        try:
+            while True:
+                try:
+                    value = stream.send(sent)
+                except StopIteration:
+                    return
+                sent = yield value
+                await asyncio.sleep(0)
+        finally:
+            stream.close()
+
+    def step(self) -> Optional[int]:
+        """Execute a single instruction, returning its output if it had one."""
+        if self.read_watches or self.write_watches or self.breakpoints:
+            return self._step_instrumented()
+        return self._execute_one()
+
+    def _run_instrumented(self, max_steps: Optional[int] = None) -> Optional[int]:
+        while max_steps is None or max_steps > 0:
+            out = self._step_instrumented()
+            self.steps += 1
+            if out is not None:
+                return out
+            if max_steps is not None:
+                max_steps -= 1
+        self.state = State.PREEMPTED
+        return None
+
+    def _step_instrumented(self) -> Optional[int]:
+        reads, writes = self.operand_addresses(get_instruction(self[self.pt]))
+        if self.pt != self._waiting_pt:
+            for callback in self.breakpoints.get(self.pt, []):
+                callback(self)
+            for address in reads:
+                for watch in self.read_watches.get(address, []):
+                    watch(self, address, self[address])
+        self._waiting_pt = None
+        try:
+            out = self._execute_one()
+        except InputRequested:
+            self._waiting_pt = self.pt
+            raise
+        for address in writes:
+            for watch in self.write_watches.get(address, []):
+                watch(self, address, self[address])
+        return out
+
+    def _execute_one(self) -> Optional[int]:
+        """Execute the instruction at pt, returning its output if it had one.
+
+        This is the single-step counterpart of `_run`, kept separate so the
+        plain loop carries no step accounting.
+        """
         self.state = State.RUNNING
         instruction = get_instruction(self[self.pt])
+        op = instruction.operation
+        modes = instruction.parameters
+        params = self[self.pt + 1 : self.pt + len(modes) + 1]
+        next_pt = self.pt + len(modes) + 1
+        out = None
+        if op == Operation.END:
+            self.state = State.HALTED
+            raise IntcodeTerminated()
+        elif op == Operation.INPUT:
+            value: Optional[int]
+            if self.inputs:
+                value = self.inputs.pop(0)
+            elif self.input_provider is not None:
+                value = self.input_provider()
+            else:
+                value = None
+            if value is None:
+                raise InputRequested()
+            self[self.get_output_pos(modes[0], params[0])] = value
+        elif op == Operation.OUTPUT:
+            value = self.get_value(modes[0], params[0])
+            if self.output is not None:
+                self.output.append(value)
+            else:
+                out = value
+        elif op == Operation.BASE:
+            self.relative_base += self.get_value(modes[0], params[0])
+        elif op in JUMP_OPS:
+            check = self.get_value(modes[0], params[0])
+            if bool(check) == (op == Operation.JUMP_TRUE):
+                next_pt = self.get_value(modes[1], params[1])
+        else:
+            lh = self.get_value(modes[0], params[0])
+            rh = self.get_value(modes[1], params[1])
+            if op == Operation.ADD:
+                value = lh + rh
+            elif op == Operation.MULTIPLY:
+                value = lh * rh
+            elif op == Operation.LESS_THAN:
+                value = int(lh < rh)
+            else:
+                value = int(lh == rh)
+            self[self.get_output_pos(modes[2], params[2])] = value
+        self.pt = next_pt
+        return out
+
+    def _run(self, stop_at: Optional[int] = None) -> Optional[int]:
+        """The main loop. With `stop_at`, steps are counted a block at a time."""
+        self.state = State.RUNNING
+        block_start = self.pt
+        instruction = get_instruction(self[self.pt])
         while instruction.operation != Operation.END:
             pointer_modified = False
             if instruction.operation == Operation.ADD:
@@ -160,10 +550,18 @@ class Computer:
             elif instruction.operation == Operation.INPUT:
                 pos = self[self.pt + 1]
                 out_pos = self.get_output_pos(instruction.parameters[0], pos)
+                value: Optional[int]
                 if self.inputs:
-                    self[out_pos] = self.inputs.pop(0)
+                    value = self.inputs.pop(0)
+                elif self.input_provider is not None:
+                    value = self.input_provider()
                 else:
+                    value = None
+                if value is None:
+                    if stop_at is not None:
+                        self.steps += self.block_length(block_start, self.pt)
                     raise InputRequested()
+                self[out_pos] = value
             elif instruction.operation == Operation.OUTPUT:
                 result = self[self.pt + 1]
                 try:
@@ -176,9 +574,12 @@ class Computer:
                     self.output.append(out)
                 else:
                     self.pt += 2
+                    if stop_at is not None:
+                        self.steps += self.block_length(block_start, self.pt)
                     return out
 
             elif instruction.operation in JUMP_OPS:
+                jump_pt = self.pt
                 check, pointer = self[self.pt + 1 : self.pt + 3]
                 check_value = self.get_value(instruction.parameters[0], check)
                 pointer_value = self.get_value(instruction.parameters[1], pointer)
@@ -188,6 +589,16 @@ class Computer:
                 ):
                     self.pt = pointer_value
                     pointer_modified = True
+
+                if stop_at is not None:
+                    if not pointer_modified:
+                        self.pt += 3
+                        pointer_modified = True
+                    self.steps += self.block_length(block_start, jump_pt + 3)
+                    block_start = self.pt
+                    if self.steps >= stop_at:
+                        self.state = State.PREEMPTED
+                        return None
             elif instruction.operation == Operation.LESS_THAN:
                 lh, rh, result = self[self.pt + 1 : self.pt + 4]
                 lh_value = self.get_value(instruction.parameters[0], lh)
@@ -210,15 +621,218 @@ class Computer:
 
             instruction = get_instruction(self[self.pt])
 
+        if stop_at is not None:
+            self.steps += self.block_length(block_start, self.pt)
         self.state = State.HALTED
         raise IntcodeTerminated()
 
     def reset(self):
-        self.code = copy(self.initial_code)
+        self.code = copy_memory(self.initial_code)
         self.pt = 0
         self.relative_base = 0
+        self.steps = 0
         self.state = State.NOT_STARTED
         self.inputs = []
+        self.memory_hash = None
+        self._waiting_pt = None
+
+    def fork(self) -> Computer:
+        """Copy the machine, carrying its hash over instead of recomputing it.
+
+        The output list is shared with the parent; give the child its own if
+        the two are going to run independently.
+        """
+        child = copy(self)
+        child.code = copy_memory(self.code)
+        # A fork of a recorded machine isn't recorded itself.
+        child.inputs = list(self.inputs)
+        if isinstance(self.output, _RecordedOutput):
+            child.output = self.output.output
+        if isinstance(self.input_provider, _RecordedProvider):
+            child.input_provider = self.input_provider.provider
+        child.read_watches = copy(self.read_watches)
+        child.write_watches = copy(self.write_watches)
+        child.breakpoints = copy(self.breakpoints)
+        return child
+
+    def hash(self) -> int:
+        """Zobrist hash of memory, pt and relative base, maintained in O(1).
+
+        The first call hashes the whole of memory. Distinct states can
+        collide, so use `same_state` to confirm a match when it matters.
+        """
+        if self.memory_hash is None:
+            self.memory_hash = memory_hash(self.code)
+        return (
+            self.memory_hash
+            ^ zobrist_key(PT_KEY, self.pt + 1)
+            ^ zobrist_key(RELATIVE_BASE_KEY, self.relative_base + 1)
+        )
+
+    def same_state(self, other: Computer) -> bool:
+        if (self.pt, self.relative_base) != (other.pt, other.relative_base):
+            return False
+        short, long = sorted((self.code, other.code), key=len)
+        return list(long[: len(short)]) == list(short) and not any(
+            long[len(short) :]
+        )
+
+
+class NullSink:
+    """Output sink that only counts outputs, for fast-forwarding."""
+
+    def __init__(self):
+        self.count = 0
+
+    def append(self, value: int) -> None:
+        self.count += 1
+
 
-    def hash(self):
-        return hash(tuple(self.code))
+@dataclass
+class Snapshot:
+    code: List[int]
+    pt: int
+    relative_base: int
+    outputs: int
+
+    def restore(self) -> Computer:
+        computer = Computer(self.code)
+        computer.pt = self.pt
+        computer.relative_base = self.relative_base
+        return computer
+
+
+@dataclass
+class SessionLog:
+    """Inputs and outputs of a recorded session, with periodic snapshots.
+
+    Step n is the point just before the nth input is consumed;
+    `input_offsets[n]` is how many outputs came before it. Values are packed
+    as 64-bit ints until one doesn't fit, when that log becomes a list.
+    """
+
+    inputs: MutableSequence[int] = field(default_factory=lambda: array("q"))
+    outputs: MutableSequence[int] = field(default_factory=lambda: array("q"))
+    input_offsets: MutableSequence[int] = field(default_factory=lambda: array("q"))
+    snapshots: Dict[int, Snapshot] = field(default_factory=dict)
+
+    def add_input(self, value: int) -> None:
+        try:
+            self.inputs.append(value)
+        except OverflowError:
+            self.inputs = list(self.inputs)
+            self.inputs.append(value)
+        self.input_offsets.append(len(self.outputs))
+
+    def add_output(self, value: int) -> None:
+        try:
+            self.outputs.append(value)
+        except OverflowError:
+            self.outputs = list(self.outputs)
+            self.outputs.append(value)
+
+    def save(self, path: str) -> None:
+        """Write the I/O log and every snapshot, so seeks stay short."""
+        with open(path, "wb") as f:
+            pickle.dump(
+                (self.inputs, self.outputs, self.input_offsets, self.snapshots), f
+            )
+
+    @classmethod
+    def load(cls, path: str) -> SessionLog:
+        with open(path, "rb") as f:
+            inputs, outputs, input_offsets, snapshots = pickle.load(f)
+        return cls(inputs, outputs, input_offsets, snapshots)
+
+
+class _RecordedInputs(list):
+    def __init__(self, recorder: Recorder, values: List[int]):
+        super().__init__(values)
+        self.recorder = recorder
+
+    def pop(self, index: SupportsIndex = -1) -> int:
+        value = super().pop(index)
+        self.recorder.record_input(value)
+        return value
+
+
+class _RecordedOutput:
+    def __init__(self, recorder: Recorder, output: OutputSink):
+        self.recorder = recorder
+        self.output = output
+
+    def append(self, value: int) -> None:
+        self.recorder.log.add_output(value)
+        self.output.append(value)
+
+
+class _RecordedProvider:
+    def __init__(self, recorder: Recorder, provider: InputProvider):
+        self.recorder = recorder
+        self.provider = provider
+
+    def __call__(self) -> Optional[int]:
+        value = self.provider()
+        if value is not None:
+            self.recorder.record_input(value)
+        return value
+
+
+class Recorder:
+    """Record every input and output of a machine from now on.
+
+    Inputs are seen both from the input queue and from the input provider,
+    so the machine's `inputs` list mustn't be replaced while recording. The
+    machine needs an output sink. A snapshot is kept every `snapshot_every`
+    inputs so that `Replay.seek` has little to re-run.
+    """
+
+    def __init__(self, computer: Computer, snapshot_every: int = 1000):
+        if computer.output is None:
+            raise ValueError("Recording needs a machine with an output sink")
+        self.computer = computer
+        self.snapshot_every = snapshot_every
+        self.log = SessionLog()
+        self.log.snapshots[0] = self.snapshot()
+        computer.inputs = _RecordedInputs(self, computer.inputs)
+        computer.output = _RecordedOutput(self, computer.output)
+        if computer.input_provider is not None:
+            computer.input_provider = _RecordedProvider(
+                self, computer.input_provider
+            )
+
+    def snapshot(self) -> Snapshot:
+        c = self.computer
+        return Snapshot(
+            list(c.code), c.pt, c.relative_base, len(self.log.outputs)
+        )
+
+    def record_input(self, value: int) -> None:
+        step = len(self.log.inputs)
+        if step and step % self.snapshot_every == 0:
+            self.log.snapshots[step] = self.snapshot()
+        self.log.add_input(value)
+
+
+class Replay:
+    """Re-run a recorded session without rendering or decoding its output."""
+
+    def __init__(self, log: SessionLog):
+        self.log = log
+
+    def seek(self, step: int) -> Computer:
+        """A machine in the state it was in just before input `step`.
+
+        The replay starts from the nearest snapshot at or before `step`, and
+        outputs on the way are only counted. Attach a real output sink to the
+        returned machine to carry on from there.
+        """
+        start = max(s for s in self.log.snapshots if s <= step)
+        computer = self.log.snapshots[start].restore()
+        computer.inputs = list(self.log.inputs[start:step])
+        computer.output = NullSink()
+        try:
+            computer.run()
+        except (InputRequested, IntcodeTerminated):
+            pass
+        return computer
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import multiprocessing
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from intcode import Computer, InputRequested, IntcodeTerminated
+
+Packet = Tuple[int, ...]
+
+DEFAULT_BUDGET = 1000
+IDLE_INPUT = -1
+
+
+class Network:
+    """Round-robin scheduler for a set of addressed Intcode machines.
+
+    Each machine is booted with its address as its first input. Outputs are
+    grouped into packets of `packet_size` values, the first of which is the
+    destination address; the rest is the payload, queued as the destination's
+    input. Packets addressed outside the network collect in `outbox`.
+
+    When a machine asks for input with nothing queued it is marked as blocked
+    and its time slice ends early. Blocked machines are given `idle_input` at
+    the start of their next slice, or left waiting if that is None.
+    """
+
+    def __init__(
+        self,
+        code: List[int],
+        size: int,
+        budget: int = DEFAULT_BUDGET,
+        packet_size: int = 3,
+        idle_input: Optional[int] = IDLE_INPUT,
+        addresses: Optional[Iterable[int]] = None,
+    ):
+        if addresses is None:
+            addresses = range(size)
+        self.size = size
+        self.budget = budget
+        self.packet_size = packet_size
+        self.idle_input = idle_input
+        self.computers: Dict[int, Computer] = {
+            address: Computer(code, inputs=[address]) for address in addresses
+        }
+        self.pending: Dict[int, List[int]] = {a: [] for a in self.computers}
+        for address, computer in self.computers.items():
+            computer.output = self.pending[address]
+        self.blocked: Set[int] = set()
+        self.halted: Set[int] = set()
+        self.outbox: Dict[int, List[Packet]] = {}
+
+    def send(self, address: int, *payload: int) -> None:
+        if address in self.computers:
+            self.computers[address].inputs.extend(payload)
+            self.blocked.discard(address)
+        else:
+            self.outbox.setdefault(address, []).append(payload)
+
+    def idle(self) -> bool:
+        return all(
+            address in self.blocked or address in self.halted
+            for address in self.computers
+        ) and not any(c.inputs for c in self.computers.values())
+
+    def run_slice(self, address: int) -> None:
+        """Run one machine for a slice of about `budget` instructions."""
+        computer = self.computers[address]
+        pending = self.pending[address]
+        if address in self.blocked and self.idle_input is not None:
+            if not computer.inputs:
+                computer.inputs.append(self.idle_input)
+            # It is only blocked again once it asks for more input.
+            self.blocked.discard(address)
+        produced = len(pending)
+        try:
+            computer.run(max_steps=self.budget)
+        except InputRequested:
+            self.blocked.add(address)
+        except IntcodeTerminated:
+            self.halted.add(address)
+        if len(pending) > produced:
+            self.blocked.discard(address)
+        while len(pending) >= self.packet_size:
+            packet = pending[: self.packet_size]
+            del pending[: self.packet_size]
+            self.send(*packet)
+
+    def run_round(self) -> None:
+        for address in self.computers:
+            if address not in self.halted:
+                self.run_slice(address)
+
+    def run(self, max_rounds: Optional[int] = None) -> int:
+        """Schedule rounds until the network goes idle, returning the count."""
+        rounds = 0
+        while not self.idle() and rounds != max_rounds:
+            self.run_round()
+            rounds += 1
+        return rounds
+
+
+def _serve_shard(
+    code: List[int],
+    size: int,
+    addresses: List[int],
+    budget: int,
+    packet_size: int,
+    idle_input: Optional[int],
+    inbox: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+) -> None:
+    shard = Network(code, size, budget, packet_size, idle_input, addresses)
+    while True:
+        deliveries = inbox.get()
+        if deliveries is None:
+            return
+        for address, payload in deliveries:
+            shard.send(address, *payload)
+        shard.run_round()
+        outgoing = [
+            (address, payload)
+            for address, payloads in shard.outbox.items()
+            for payload in payloads
+        ]
+        shard.outbox.clear()
+        results.put((outgoing, shard.idle()))
+
+
+class ProcessNetwork:
+    """A `Network` split into shards, each scheduled in its own process.
+
+    Shards run their rounds in lockstep; packets between shards and to
+    addresses outside the network are routed here between rounds.
+    """
+
+    def __init__(
+        self,
+        code: List[int],
+        size: int,
+        processes: Optional[int] = None,
+        budget: int = DEFAULT_BUDGET,
+        packet_size: int = 3,
+        idle_input: Optional[int] = IDLE_INPUT,
+    ):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        processes = max(1, min(processes, size))
+        self.size = size
+        self.shard_of = [address * processes // size for address in range(size)]
+        self.outbox: Dict[int, List[Packet]] = {}
+        self.deliveries: List[List[Tuple[int, Packet]]] = [
+            [] for _ in range(processes)
+        ]
+        self.results: multiprocessing.Queue = multiprocessing.Queue()
+        self.inboxes: List[multiprocessing.Queue] = []
+        self.workers: List[multiprocessing.Process] = []
+        for shard in range(processes):
+            addresses = [a for a in range(size) if self.shard_of[a] == shard]
+            inbox: multiprocessing.Queue = multiprocessing.Queue()
+            worker = multiprocessing.Process(
+                target=_serve_shard,
+                args=(
+                    code,
+                    size,
+                    addresses,
+                    budget,
+                    packet_size,
+                    idle_input,
+                    inbox,
+                    self.results,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            self.inboxes.append(inbox)
+            self.workers.append(worker)
+
+    def send(self, address: int, *payload: int) -> None:
+        if 0 <= address < self.size:
+            self.deliveries[self.shard_of[address]].append((address, payload))
+        else:
+            self.outbox.setdefault(address, []).append(payload)
+
+    def run_round(self) -> bool:
+        """Run every shard for one round; return whether the network is idle."""
+        routed = any(self.deliveries)
+        for inbox, deliveries in zip(self.inboxes, self.deliveries):
+            inbox.put(deliveries)
+        self.deliveries = [[] for _ in self.inboxes]
+
+        all_idle = True
+        for _ in self.inboxes:
+            outgoing, idle = self.results.get()
+            all_idle = all_idle and idle
+            for address, payload in outgoing:
+                self.send(address, *payload)
+        return all_idle and not routed and not any(self.deliveries)
+
+    def run(self, max_rounds: Optional[int] = None) -> int:
+        rounds = 0
+        while rounds != max_rounds:
+            rounds += 1
+            if self.run_round():
+                break
+        return rounds
+
+    def close(self) -> None:
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self) -> ProcessNetwork:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
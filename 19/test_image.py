@@ -0,0 +1,26 @@
+from intcode import IntcodeTerminated
+from image import SharedImage, run_many
+
+# Outputs the sum of its two inputs.
+ADDER = [3, 11, 3, 12, 1, 11, 12, 11, 4, 11, 99]
+
+
+def test_run_many():
+    with SharedImage.publish(ADDER) as image:
+        results = run_many(image, [[i, i * 10] for i in range(20)], processes=2)
+    assert results == [[i * 11] for i in range(20)]
+
+
+def test_copy_on_write():
+    with SharedImage.publish(ADDER) as image:
+        c = image.computer(inputs=[2, 3], output=[])
+        try:
+            c.run()
+        except IntcodeTerminated:
+            pass
+        assert c.output == [5]
+        assert isinstance(c.code, list)
+        assert list(image.view) == ADDER
+        c.reset()
+        assert list(c.code) == ADDER
+        del c
@@ -0,0 +1,263 @@
+import asyncio
+import time
+
+from intcode import (
+    AsciiSink,
+    Computer,
+    InputRequested,
+    IntcodeTerminated,
+    RecordSink,
+    Recorder,
+    Replay,
+    SessionLog,
+    State,
+    memory_hash,
+)
+
+
+def test_write_code():
+    c = Computer([1, 2, 3])
+    c[5] = 10
+    assert c.code == [1, 2, 3, 0, 0, 10]
+
+
+def test_hash_tracks_writes():
+    c = Computer([1, 2, 3])
+    c.hash()
+    c[1] = 7
+    c[6] = 4
+    assert c.memory_hash == memory_hash(c.code)
+    assert c.memory_hash == memory_hash([1, 7, 3, 0, 0, 0, 4])
+
+
+def test_hash_ignores_zero_padding():
+    a = Computer([1, 2, 3])
+    b = Computer([1, 2, 3, 0, 0])
+    assert a.hash() == b.hash()
+    assert a.same_state(b)
+
+
+def test_hash_includes_registers():
+    a = Computer([3, 0, 99])
+    b = a.fork()
+    b.pt = 2
+    assert a.hash() != b.hash()
+    assert not a.same_state(b)
+
+
+def test_fork_runs_independently():
+    a = Computer([3, 9, 4, 9, 99])
+    b = a.fork()
+    a.inputs.append(1)
+    b.inputs.append(2)
+    assert a.run() == 1
+    assert b.run() == 2
+    assert a.hash() != b.hash()
+    b.reset()
+    assert b.hash() == Computer([3, 9, 4, 9, 99]).hash()
+
+
+def test_watch_write():
+    # Adds 1 to address 9 three times, then halts.
+    code = [1001, 9, 1, 9, 1005, 9, 0, 99, 0, -3]
+    c = Computer(code)
+    seen = []
+    c.watch_write(9, lambda comp, address, value: seen.append(value))
+    try:
+        c.run()
+    except IntcodeTerminated:
+        pass
+    assert seen == [-2, -1, 0]
+
+
+def test_watch_read_and_breakpoint():
+    c = Computer([4, 5, 4, 5, 99, 42])
+    reads = []
+    hits = []
+    c.watch_read(5, lambda comp, address, value: reads.append(value))
+    c.break_at(2, lambda comp: hits.append(comp.pt))
+    assert c.run() == 42
+    assert c.run() == 42
+    assert reads == [42, 42]
+    assert hits == [2]
+
+
+def test_stream_outputs():
+    # Echoes inputs until it reads a zero.
+    code = [3, 11, 1005, 11, 6, 99, 4, 11, 1105, 1, 0, 0]
+    c = Computer(code)
+    stream = c.stream_outputs()
+    assert next(stream) is None
+    assert stream.send(5) == 5
+    assert next(stream) is None
+    assert stream.send(7) == 7
+    assert next(stream) is None
+    try:
+        stream.send(0)
+    except StopIteration:
+        pass
+    else:
+        assert False
+
+
+def test_async_stream_outputs():
+    c = Computer([104, 1, 104, 2, 104, 3, 99])
+
+    async def collect():
+        return [value async for value in c.astream_outputs()]
+
+    assert asyncio.run(collect()) == [1, 2, 3]
+
+
+def test_breakpoint_on_input_fires_once():
+    c = Computer([3, 7, 4, 7, 1105, 1, 0, 0])
+    hits = []
+    c.break_at(0, lambda comp: hits.append(comp.pt))
+    try:
+        c.run()
+    except InputRequested:
+        pass
+    c.inputs.append(5)
+    assert c.run() == 5
+    assert hits == [0]
+
+
+def test_max_steps_preempts():
+    # Counts address 9 down forever.
+    c = Computer([1001, 9, -1, 9, 1105, 1, 0, 99, 0, 0])
+    assert c.run(max_steps=10) is None
+    assert c.state == State.PREEMPTED
+    assert c.steps == 10
+    assert c[9] == -5
+    c.run(max_steps=4)
+    assert c.steps == 14
+    assert c[9] == -7
+
+
+def test_max_steps_keeps_output():
+    c = Computer([104, 1, 104, 2, 99])
+    assert c.run(max_steps=100) == 1
+    assert c.run(max_steps=100) == 2
+    assert c.steps == 2
+
+
+def test_deadline_preempts():
+    c = Computer([1105, 1, 0])
+    assert c.run(deadline=time.monotonic() + 0.01) is None
+    assert c.state == State.PREEMPTED
+    assert c.steps > 0
+
+
+def test_ascii_sink():
+    lines = []
+    sink = AsciiSink(on_line=lines.append)
+    c = Computer([104, 35, 104, 10, 104, 46, 104, 10, 104, 1000, 99], output=sink)
+    try:
+        c.run()
+    except IntcodeTerminated:
+        pass
+    assert lines == ["#", "."]
+    assert sink.text() == "#\n.\n"
+    assert sink.values == [1000]
+
+
+def test_record_sink():
+    sink = RecordSink(2)
+    c = Computer([104, 1, 104, 2, 104, 3, 104, 4, 104, 5, 99], output=sink)
+    try:
+        c.run()
+    except IntcodeTerminated:
+        pass
+    assert sink.records == [(1, 2), (3, 4)]
+    assert sink.filled == 1
+
+
+def test_input_provider():
+    values = iter([3, 4])
+    c = Computer(
+        [3, 11, 3, 12, 2, 11, 12, 11, 4, 11, 99],
+        input_provider=lambda: next(values, None),
+    )
+    assert c.run() == 12
+
+
+def test_input_provider_without_value():
+    c = Computer([3, 5, 4, 5, 99], input_provider=lambda: None)
+    try:
+        c.run()
+    except InputRequested:
+        pass
+    else:
+        assert False
+    c.inputs.append(8)
+    assert c.run() == 8
+
+
+def test_record_and_replay(tmp_path):
+    # Outputs a running total of its inputs.
+    code = [3, 11, 1, 11, 12, 12, 4, 12, 1105, 1, 0, 0, 0]
+    values = iter([5, 1, 4, 10, 2])
+    output = []
+    c = Computer(
+        code,
+        inputs=[3],
+        output=output,
+        input_provider=lambda: next(values, None),
+    )
+    recorder = Recorder(c, snapshot_every=2)
+    try:
+        c.run()
+    except InputRequested:
+        pass
+    assert output == [3, 8, 9, 13, 23, 25]
+    log = recorder.log
+    assert list(log.inputs) == [3, 5, 1, 4, 10, 2]
+    assert list(log.input_offsets) == [0, 1, 2, 3, 4, 5]
+    assert sorted(log.snapshots) == [0, 2, 4]
+
+    path = str(tmp_path / "session.log")
+    log.save(path)
+    for replay_log in (log, SessionLog.load(path)):
+        machine = Replay(replay_log).seek(3)
+        assert machine[12] == 9
+        machine.output = None
+        machine.inputs.append(100)
+        assert machine.run() == 109
+    assert sorted(SessionLog.load(path).snapshots) == [0, 2, 4]
+
+
+def test_fork_of_recorded_machine_is_not_recorded():
+    code = [3, 11, 1, 11, 12, 12, 4, 12, 1105, 1, 0, 0, 0]
+    output = []
+    c = Computer(code, inputs=[3], output=output)
+    recorder = Recorder(c)
+    try:
+        c.run()
+    except InputRequested:
+        pass
+    child = c.fork()
+    child.output = []
+    child.inputs.append(1)
+    try:
+        child.run()
+    except InputRequested:
+        pass
+    assert child.output == [4]
+    assert output == [3]
+    assert list(recorder.log.inputs) == [3]
+    assert list(recorder.log.outputs) == [3]
+
+
+def test_recording_wide_values(tmp_path):
+    output = []
+    c = Computer([3, 9, 4, 9, 3, 9, 4, 9, 99, 0], inputs=[1, 2 ** 70], output=output)
+    recorder = Recorder(c)
+    try:
+        c.run()
+    except IntcodeTerminated:
+        pass
+    assert list(recorder.log.inputs) == [1, 2 ** 70]
+    assert list(recorder.log.outputs) == [1, 2 ** 70]
+    path = str(tmp_path / "session.log")
+    recorder.log.save(path)
+    assert list(SessionLog.load(path).outputs) == [1, 2 ** 70]
@@ -0,0 +1,30 @@
+from network import Network, ProcessNetwork
+
+# Boots with its address, then for every value x it receives sends x + 1 on
+# to the next address. Reads of -1 (no packet) are ignored.
+RELAY = [
+    3, 100, 1001, 100, 1, 103, 3, 101, 1008, 101, -1, 102, 1005, 102, 6,
+    1001, 101, 1, 101, 4, 103, 4, 101, 1105, 1, 6,
+]
+
+
+def test_relay():
+    net = Network(RELAY, 3, packet_size=2)
+    net.send(0, 10)
+    net.run()
+    assert net.idle()
+    assert net.outbox == {3: [(13,)]}
+
+
+def test_small_budget_is_fair():
+    net = Network(RELAY, 50, budget=4, packet_size=2)
+    net.send(0, 0)
+    net.run()
+    assert net.outbox == {50: [(50,)]}
+
+
+def test_process_network():
+    with ProcessNetwork(RELAY, 6, processes=2, packet_size=2) as net:
+        net.send(0, 10)
+        net.run()
+        assert net.outbox == {6: [(16,)]}
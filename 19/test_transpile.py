@@ -0,0 +1,41 @@
+import pytest
+
+from intcode import InputRequested
+from transpile import NotTranspilable, compile_program, interpret, load, transpile
+
+# Outputs 1 if the input is less than 8, otherwise 0 (position mode only).
+LESS_THAN_8 = [3, 9, 7, 9, 10, 9, 4, 9, 99, -1, 8]
+
+# Counts down from its input, outputting each value, using relative mode.
+COUNTDOWN = [109, 20, 203, 0, 204, 0, 21201, 0, -1, 0, 1205, 20, 4, 99]
+
+# Adds its input to the output opcode at 6, so 100 switches it to immediate.
+SELF_MODIFYING = [3, 9, 1, 9, 6, 6, 4, 10, 99, 0, 42]
+
+
+def test_locals_program(tmp_path):
+    source = transpile(LESS_THAN_8)
+    assert "m[" not in source
+    program = load(LESS_THAN_8, cache_dir=str(tmp_path))
+    assert program([3]) == [1]
+    assert program([9]) == [0]
+
+
+@pytest.mark.parametrize("start", [0, 1, 5])
+def test_relative_program(start, tmp_path):
+    program = compile_program(COUNTDOWN, cache_dir=str(tmp_path))
+    assert program([start]) == interpret(COUNTDOWN, [start])
+    assert list(tmp_path.iterdir())
+
+
+def test_missing_input(tmp_path):
+    with pytest.raises(InputRequested):
+        load(LESS_THAN_8, cache_dir=str(tmp_path))([])
+
+
+def test_self_modifying_falls_back(tmp_path):
+    with pytest.raises(NotTranspilable):
+        transpile(SELF_MODIFYING)
+    program = compile_program(SELF_MODIFYING, cache_dir=str(tmp_path))
+    assert program([0]) == [42]
+    assert program([100]) == [10]
@@ -0,0 +1,400 @@
+"""Ahead-of-time translation of Intcode programs into Python functions.
+
+A program is decoded by following its control flow from address 0. Every
+jump target starts a basic block, and the generated function dispatches
+between blocks on a `pc` variable with a binary tree of comparisons. When no
+instruction uses relative mode every memory access is to a fixed address, so
+each cell the program touches becomes a local variable; otherwise memory is
+a list local to the function.
+
+Programs that write over their own opcodes or operand addresses are
+refused. Writes to an immediate operand, such as a computed call target, are
+allowed by reading that operand from memory at run time. Anything the
+static pass can't rule out (an indirect jump to an address that wasn't
+decoded, a relative write over code, memory outgrowing its preallocation)
+raises FallbackRequired at run time, and `compile_program` reruns the
+inputs on the interpreter instead.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from intcode import (
+    Computer,
+    IntcodeTerminated,
+    Mode,
+    OP_PARAMETER_MAP,
+    OP_WRITE_PARAMETER,
+    Operation,
+    get_instruction,
+)
+
+TRANSPILER_VERSION = 1
+
+# Free memory past the end of the program given to list-backed programs.
+SPARE_MEMORY = 10000
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "__pycache__", "intcode"
+)
+
+Program = Callable[[List[int]], List[int]]
+
+JUMPS = (Operation.JUMP_TRUE, Operation.JUMP_FALSE)
+
+
+class NotTranspilable(Exception):
+    pass
+
+
+class FallbackRequired(Exception):
+    pass
+
+
+@dataclass
+class Decoded:
+    pt: int
+    operation: Operation
+    modes: List[Mode]
+    params: List[int]
+
+    @property
+    def next_pt(self) -> int:
+        return self.pt + len(self.params) + 1
+
+    def successors(self) -> Iterator[int]:
+        """Addresses control can reach directly, not counting indirect jumps."""
+        if self.operation == Operation.END:
+            return
+        if self.operation in JUMPS:
+            if self.modes[1] == Mode.IMMEDIATE:
+                yield self.params[1]
+            if self.modes[0] == Mode.IMMEDIATE:
+                taken = bool(self.params[0]) == (
+                    self.operation == Operation.JUMP_TRUE
+                )
+                if taken:
+                    return
+        yield self.next_pt
+
+
+def decode_at(code: List[int], pt: int) -> Decoded:
+    if not 0 <= pt < len(code):
+        raise NotTranspilable(f"Control reaches {pt}, outside the program")
+    try:
+        instruction = get_instruction(code[pt])
+    except (ValueError, KeyError):
+        raise NotTranspilable(f"No valid instruction at {pt}")
+    n = OP_PARAMETER_MAP[instruction.operation]
+    params = code[pt + 1 : pt + 1 + n]
+    if len(params) < n:
+        raise NotTranspilable(f"Instruction at {pt} runs off the program")
+    return Decoded(pt, instruction.operation, instruction.parameters, params)
+
+
+def trace(code: List[int], entries: List[int]) -> Dict[int, Decoded]:
+    decoded: Dict[int, Decoded] = {}
+    work = list(entries)
+    while work:
+        pt = work.pop()
+        if pt in decoded:
+            continue
+        instruction = decode_at(code, pt)
+        decoded[pt] = instruction
+        work.extend(instruction.successors())
+    return decoded
+
+
+def decode(code: List[int]) -> Tuple[Dict[int, Decoded], List[int]]:
+    """Decode every instruction reachable from address 0.
+
+    Indirect jumps usually return to an address that was pushed as an
+    immediate operand, so those are traced too where they decode cleanly.
+    Returns the instructions and the addresses tracing started from.
+    """
+    decoded = trace(code, [0])
+    covered = coverage(decoded)
+    entries = [0]
+    tried: Set[int] = set()
+    while True:
+        candidates = {
+            param
+            for instruction in decoded.values()
+            if instruction.operation not in JUMPS
+            for mode, param in zip(instruction.modes, instruction.params)
+            if mode == Mode.IMMEDIATE and 0 <= param < len(code)
+        } - tried - set(decoded)
+        if not candidates:
+            break
+        for candidate in sorted(candidates):
+            tried.add(candidate)
+            if candidate in decoded:
+                continue
+            try:
+                extra = trace(code, [candidate])
+                extra_covered = coverage(extra)
+            except NotTranspilable:
+                continue
+            # Most immediates aren't addresses at all; skip any that land in
+            # the middle of instructions we already know about.
+            if any(covered.get(a, pt) != pt for a, pt in extra_covered.items()):
+                continue
+            decoded.update(extra)
+            covered.update(extra_covered)
+            entries.append(candidate)
+    return decoded, entries
+
+
+def coverage(decoded: Dict[int, Decoded]) -> Dict[int, int]:
+    """Map each address in `decoded` to the instruction covering it."""
+    covered: Dict[int, int] = {}
+    for pt, instruction in decoded.items():
+        for address in range(pt, instruction.next_pt):
+            if covered.setdefault(address, pt) != pt:
+                raise NotTranspilable(f"Instructions overlap at {address}")
+    return covered
+
+
+def find_leaders(decoded: Dict[int, Decoded], entries: List[int]) -> List[int]:
+    leaders = set(entries)
+    for instruction in decoded.values():
+        if instruction.operation in JUMPS:
+            leaders.update(instruction.successors())
+    return sorted(pt for pt in leaders if pt in decoded)
+
+
+def evaluate(op: Operation, lh: int, rh: int) -> int:
+    if op == Operation.ADD:
+        return lh + rh
+    if op == Operation.MULTIPLY:
+        return lh * rh
+    if op == Operation.LESS_THAN:
+        return int(lh < rh)
+    return int(lh == rh)
+
+
+class Generator:
+    def __init__(self, code: List[int]):
+        self.code = code
+        self.decoded, entries = decode(code)
+        self.leaders = find_leaders(self.decoded, entries)
+        self.relative = any(
+            Mode.RELATIVE in instruction.modes for instruction in self.decoded.values()
+        )
+        operands: Dict[int, Tuple[Decoded, int]] = {
+            instruction.pt + i + 1: (instruction, i)
+            for instruction in self.decoded.values()
+            for i in range(len(instruction.params))
+        }
+
+        self.cells: Set[int] = set()
+        written: Set[int] = set()
+        for instruction in self.decoded.values():
+            write_param = OP_WRITE_PARAMETER.get(instruction.operation)
+            for i, (mode, param) in enumerate(
+                zip(instruction.modes, instruction.params)
+            ):
+                if mode != Mode.POSITION:
+                    continue
+                if param < 0:
+                    raise NotTranspilable(f"Negative address at {instruction.pt}")
+                if i == write_param and param in self.decoded:
+                    raise NotTranspilable(
+                        f"Instruction at {instruction.pt} writes an opcode at {param}"
+                    )
+                self.cells.add(param)
+                if i == write_param:
+                    written.add(param)
+
+        # A write to an immediate operand (such as a computed call target)
+        # is fine as long as that operand is read from memory at run time.
+        self.dynamic: Set[int] = written & set(operands)
+        for address in self.dynamic:
+            instruction, i = operands[address]
+            if instruction.modes[i] != Mode.IMMEDIATE:
+                raise NotTranspilable(
+                    f"Instruction at {instruction.pt} has its address rewritten"
+                )
+            instruction.modes[i] = Mode.POSITION
+            instruction.params[i] = address
+        # Relative writes over anything else still decoded as code bail out.
+        self.code_cells: Set[int] = (set(self.decoded) | set(operands)) - self.dynamic
+        self.lines: List[str] = []
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def read(self, mode: Mode, param: int) -> str:
+        if mode == Mode.IMMEDIATE:
+            return repr(param)
+        if mode == Mode.POSITION:
+            return f"c{param}" if not self.relative else f"m[{param}]"
+        return f"m[rb {'-' if param < 0 else '+'} {abs(param)}]" if param else "m[rb]"
+
+    def write(self, indent: int, mode: Mode, param: int, value: str) -> None:
+        if mode == Mode.POSITION:
+            self.emit(indent, f"{self.read(mode, param)} = {value}")
+            return
+        self.emit(indent, f"a = rb {'-' if param < 0 else '+'} {abs(param)}")
+        self.emit(indent, "if code_mask[a]:")
+        self.emit(indent + 1, "raise FallbackRequired()")
+        self.emit(indent, f"m[a] = {value}")
+
+    def source(self) -> str:
+        memory_size = max([len(self.code)] + [c + 1 for c in self.cells])
+        self.emit(0, "from intcode import InputRequested")
+        self.emit(0, "from transpile import FallbackRequired")
+        self.emit(0, "")
+        if self.relative:
+            memory_size += SPARE_MEMORY
+            memory = self.code + [0] * (memory_size - len(self.code))
+            mask = [int(a in self.code_cells) for a in range(memory_size)]
+            self.emit(0, f"MEMORY = {memory!r}")
+            self.emit(0, f"CODE_MASK = bytes({mask!r})")
+        self.emit(0, "")
+        self.emit(0, "")
+        self.emit(0, "def program(inputs):")
+        self.emit(1, "out = []")
+        self.emit(1, "emit = out.append")
+        self.emit(1, "n_inputs = len(inputs)")
+        self.emit(1, "ip = 0")
+        self.emit(1, "rb = 0")
+        if self.relative:
+            self.emit(1, "m = MEMORY[:]")
+            self.emit(1, "code_mask = CODE_MASK")
+        else:
+            for cell in sorted(self.cells):
+                value = self.code[cell] if cell < len(self.code) else 0
+                self.emit(1, f"c{cell} = {value}")
+        self.emit(1, "pc = 0")
+        self.emit(1, "while True:")
+        self.dispatch(2, self.leaders)
+        return "\n".join(self.lines) + "\n"
+
+    def dispatch(self, indent: int, leaders: List[int]) -> None:
+        if len(leaders) > 4:
+            mid = len(leaders) // 2
+            self.emit(indent, f"if pc < {leaders[mid]}:")
+            self.dispatch(indent + 1, leaders[:mid])
+            self.emit(indent, "else:")
+            self.dispatch(indent + 1, leaders[mid:])
+            return
+        for i, leader in enumerate(leaders):
+            self.emit(indent, f"{'if' if i == 0 else 'elif'} pc == {leader}:")
+            self.block(indent + 1, leader)
+        self.emit(indent, "else:")
+        self.emit(indent + 1, "raise FallbackRequired()")
+
+    def block(self, indent: int, pt: int) -> None:
+        leaders = set(self.leaders)
+        while True:
+            instruction = self.decoded[pt]
+            op = instruction.operation
+            modes = instruction.modes
+            params = instruction.params
+            if op == Operation.END:
+                self.emit(indent, "return out")
+                return
+            if op in JUMPS:
+                check = self.read(modes[0], params[0])
+                target = self.read(modes[1], params[1])
+                if modes[0] == Mode.IMMEDIATE:
+                    taken = bool(params[0]) == (op == Operation.JUMP_TRUE)
+                    if taken:
+                        self.emit(indent, f"pc = {target}")
+                        return
+                else:
+                    condition = check if op == Operation.JUMP_TRUE else f"not {check}"
+                    self.emit(indent, f"if {condition}:")
+                    self.emit(indent + 1, f"pc = {target}")
+                    self.emit(indent + 1, "continue")
+            elif op == Operation.INPUT:
+                self.emit(indent, "if ip == n_inputs:")
+                self.emit(indent + 1, "raise InputRequested()")
+                self.write(indent, modes[0], params[0], "inputs[ip]")
+                self.emit(indent, "ip += 1")
+            elif op == Operation.OUTPUT:
+                self.emit(indent, f"emit({self.read(modes[0], params[0])})")
+            elif op == Operation.BASE:
+                self.emit(indent, f"rb += {self.read(modes[0], params[0])}")
+            else:
+                lh = self.read(modes[0], params[0])
+                rh = self.read(modes[1], params[1])
+                if modes[0] == modes[1] == Mode.IMMEDIATE:
+                    value = repr(evaluate(op, params[0], params[1]))
+                else:
+                    value = {
+                        Operation.ADD: f"{lh} + {rh}",
+                        Operation.MULTIPLY: f"{lh} * {rh}",
+                        Operation.LESS_THAN: f"1 if {lh} < {rh} else 0",
+                        Operation.EQUALS: f"1 if {lh} == {rh} else 0",
+                    }[op]
+                self.write(indent, modes[2], params[2], value)
+            pt = instruction.next_pt
+            if pt in leaders or pt not in self.decoded:
+                self.emit(indent, f"pc = {pt}")
+                return
+
+
+def transpile(code: List[int]) -> str:
+    """Python source for a module whose `program(inputs)` returns the outputs."""
+    return Generator(code).source()
+
+
+def program_key(code: List[int]) -> str:
+    text = f"{TRANSPILER_VERSION}:" + ",".join(str(i) for i in code)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def interpret(code: List[int], inputs: List[int]) -> List[int]:
+    output: List[int] = []
+    computer = Computer(code, inputs=list(inputs), output=output)
+    try:
+        computer.run()
+    except IntcodeTerminated:
+        pass
+    return output
+
+
+def load(code: List[int], cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[Program]:
+    """The compiled `program` function, transpiling and caching it if needed.
+
+    Returns None if the program can't be transpiled.
+    """
+    path = os.path.join(cache_dir, f"intcode_{program_key(code)}.py")
+    if not os.path.exists(path):
+        try:
+            source = transpile(code)
+        except NotTranspilable:
+            return None
+        os.makedirs(cache_dir, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            f.write(source)
+        os.replace(partial, path)
+    spec = importlib.util.spec_from_file_location(
+        f"intcode_{program_key(code)}", path
+    )
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.program
+
+
+def compile_program(code: List[int], cache_dir: str = DEFAULT_CACHE_DIR) -> Program:
+    """A function from inputs to outputs, running natively where possible."""
+    compiled = load(code, cache_dir)
+    if compiled is None:
+        return lambda inputs: interpret(code, inputs)
+
+    def run(inputs: List[int]) -> List[int]:
+        try:
+            return compiled(inputs)
+        except (FallbackRequired, IndexError):
+            return interpret(code, inputs)
+
+    return run